@@ -25,12 +25,11 @@ sys.path.append(os.path.join(os.getcwd(), "src"))
 from database.lmdb_env import TemplateDBEnv
 from database.basis import ECA57Basis
 from database.templates import TemplateStore, OriginKind, decode_gates_eca57
-from database.unroll import unroll_template, UnrollConfig, unroll_and_insert
+from database.unroll import UnrollConfig, unroll_and_insert, unroll_and_insert_many
 from database.witnesses import WitnessStore
 from synthesizers.eca57_dimgroup_synthesizer import ECA57DimGroupSynthesizer
 
 # Parallel handling
-from concurrent.futures import ProcessPoolExecutor, as_completed
 import multiprocessing
 
 
@@ -50,12 +49,6 @@ def get_default_workers():
     return max(1, multiprocessing.cpu_count() - 1)
 
 
-def run_unroll_job(gates, width, basis, config):
-    """Worker function to run unrolling. Must be top-level for pickling."""
-    # Convert generator to list so it can be returned across process boundaries
-    return list(unroll_template(gates, width, basis, config))
-
-
 def explore_staggered(db_path: str, max_width_limit: int, solver_inputs: str, skip_witnesses: bool = False, parallel_unroll: bool = True, min_width_limit: int = 3, num_workers: Optional[int] = None, single_gc: Optional[int] = None):
     """Run staggered exploration loop.
     
@@ -137,53 +130,22 @@ def explore_staggered(db_path: str, max_width_limit: int, solver_inputs: str, sk
             new_templates = 0
             new_variants = 0
             
-            # Helper for unrolling result processing
-            def process_unroll_result(source_gates, source_record, variants_iter):
-                count = 0
-                for variant_gates, unroll_ops in variants_iter:
-                    # Insert variant
-                    rec = store.insert_template(
-                        gates=variant_gates,
-                        width=width,
-                        origin=OriginKind.UNROLL,
-                        origin_template_id=source_record.template_id,
-                        unroll_ops=unroll_ops,
-                        family_hash=source_record.family_hash
-                    )
-                    if rec:
-                        count += 1
-                return count
-
             if parallel_unroll and synth_count > 1:
-                # Parallel unrolling (use effective_workers)
-                with ProcessPoolExecutor(max_workers=effective_workers) as executor:
-                    futures = {}
-                    
-                    # 1. Insert base templates first (need IDs for linking)
-                    base_records = []
-                    for circuit in dimgroup:
-                        # Fix: use method call
-                        gates = [(g.target, g.ctrl1, g.ctrl2) for g in circuit.gates()]
-                        rec = store.insert_template(gates, width, OriginKind.SAT)
-                        if rec:
-                            new_templates += 1
-                            base_records.append((rec, gates))
-                    
-                    # 2. Submit unroll tasks
-                    for record, gates in base_records:
-                        # Submit task using top-level helper function
-                        fut = executor.submit(run_unroll_job, gates, width, basis, unroll_config)
-                        futures[fut] = record
-
-                    # 3. Collect results
-                    for fut in as_completed(futures):
-                        record = futures[fut]
-                        try:
-                            variants = fut.result()
-                            inserted = process_unroll_result(None, record, variants)
-                            new_variants += inserted
-                        except Exception as e:
-                            print(f"[ERR: {e}]", end="")
+                # 1. Insert base templates first (need IDs for linking)
+                base_records = []
+                for circuit in dimgroup:
+                    # Fix: use method call
+                    gates = [(g.target, g.ctrl1, g.ctrl2) for g in circuit.gates()]
+                    rec = store.insert_template(gates, width, OriginKind.SAT)
+                    if rec:
+                        new_templates += 1
+                        base_records.append((rec, gates))
+                
+                # 2. Unroll in worker processes, write here in seed order
+                inserted, _ = unroll_and_insert_many(
+                    store, base_records, width, unroll_config, workers=effective_workers
+                )
+                new_variants += inserted
             else:
                 # Sequential unrolling
                 for circuit in dimgroup:
@@ -11,6 +11,10 @@ from typing import Dict, Optional
 from circuit.eca57_dim_group import ECA57DimGroup
 
 
+# Pre-encoded decimal bytes for wire indices (ECA57 wires fit in one byte)
+_INT_BYTES = [str(i).encode() for i in range(256)]
+
+
 class ECA57Collection:
     """Nested container for ECA57 circuits by dimensions.
     
@@ -20,13 +24,20 @@ class ECA57Collection:
         >>> coll = ECA57Collection(max_width=5, max_gate_count=6)
         >>> coll[3][4] = ECA57DimGroup(3, 4)
         >>> circuits = coll[3][4]
+    
+    Attributes:
+        max_width: Maximum wire count.
+        max_gate_count: Maximum gate count.
+        _data: Nested dict width -> gate_count -> ECA57DimGroup (or None).
     """
     
+    __slots__ = ("max_width", "max_gate_count", "_data")
+    
     def __init__(self, max_width: int, max_gate_count: int):
         """Initialize empty collection with given bounds."""
         assert max_width >= 3, "ECA57 requires at least 3 wires"
-        self._max_width = max_width
-        self._max_gate_count = max_gate_count
+        self.max_width = max_width
+        self.max_gate_count = max_gate_count
         
         # Initialize nested structure
         self._data: Dict[int, Dict[int, Optional[ECA57DimGroup]]] = {}
@@ -39,13 +50,16 @@ class ECA57Collection:
         """Get subcollection for given width."""
         return self._data[width]
     
-    @property
-    def max_width(self) -> int:
-        return self._max_width
+    def group(self, width: int, gate_count: int) -> Optional[ECA57DimGroup]:
+        """Return the DimGroup for (width, gate_count), or None if empty or out of range."""
+        return self._data.get(width, {}).get(gate_count)
     
-    @property
-    def max_gate_count(self) -> int:
-        return self._max_gate_count
+    def group_or_new(self, width: int, gate_count: int) -> ECA57DimGroup:
+        """Return the DimGroup for (width, gate_count), creating it if empty."""
+        dg = self._data[width][gate_count]
+        if dg is None:
+            dg = self._data[width][gate_count] = ECA57DimGroup(width, gate_count)
+        return dg
     
     def total_circuits(self) -> int:
         """Count total circuits across all dimensions."""
@@ -59,7 +73,7 @@ class ECA57Collection:
     
     def summary(self) -> str:
         """Return summary string of collection contents."""
-        lines = [f"ECA57Collection (max_width={self._max_width}, max_gc={self._max_gate_count})"]
+        lines = [f"ECA57Collection (max_width={self.max_width}, max_gc={self.max_gate_count})"]
         for w in sorted(self._data.keys()):
             for gc in sorted(self._data[w].keys()):
                 dg = self._data[w][gc]
@@ -72,8 +86,8 @@ class ECA57Collection:
     def save_json(self, path: Path) -> None:
         """Save collection to JSON file."""
         data = {
-            "max_width": self._max_width,
-            "max_gate_count": self._max_gate_count,
+            "max_width": self.max_width,
+            "max_gate_count": self.max_gate_count,
             "groups": {}
         }
         
@@ -103,16 +117,24 @@ class ECA57Collection:
     
     def save_compact(self, path: Path) -> None:
         """Save collection in compact format (one line per circuit)."""
-        with open(path, "w") as f:
-            f.write(f"# ECA57Collection max_width={self._max_width} max_gc={self._max_gate_count}\n")
+        ib = _INT_BYTES
+        with open(path, "wb") as f:
+            header = f"# ECA57Collection max_width={self.max_width} max_gc={self.max_gate_count}\n"
+            f.write(header.encode())
             for w in sorted(self._data.keys()):
                 for gc in sorted(self._data[w].keys()):
                     dg = self._data[w][gc]
                     if dg and len(dg) > 0:
+                        # One buffered write per DimGroup instead of one per circuit
+                        prefix = b"%d,%d:" % (w, gc)
+                        lines = []
                         for circ in dg:
-                            gates_str = ";".join(f"{g.target},{g.ctrl1},{g.ctrl2}" 
-                                                for g in circ.gates())
-                            f.write(f"{w},{gc}:{gates_str}\n")
+                            parts = [
+                                ib[g.target] + b"," + ib[g.ctrl1] + b"," + ib[g.ctrl2]
+                                for g in circ.gates()
+                            ]
+                            lines.append(prefix + b";".join(parts) + b"\n")
+                        f.write(b"".join(lines))
     
     @classmethod
     def load_compact(cls, path: Path) -> "ECA57Collection":
@@ -147,28 +169,24 @@ class ECA57Collection:
         
         coll = cls(max_w, max_gc)
         
+        from gates.eca57 import ECA57Circuit
         for w, gc, gates in circuits:
-            if coll._data[w][gc] is None:
-                coll._data[w][gc] = ECA57DimGroup(w, gc)
-            from gates.eca57 import ECA57Circuit
             circ = ECA57Circuit(w)
             for t, c1, c2 in gates:
                 circ.add_gate(t, c1, c2)
-            coll._data[w][gc].append(circ)
+            coll.group_or_new(w, gc).append(circ)
         
         return coll
     
     def join(self, other: "ECA57Collection") -> None:
         """Merge another Collection's circuits into this one."""
-        assert self._max_width == other._max_width
-        assert self._max_gate_count == other._max_gate_count
+        assert self.max_width == other.max_width
+        assert self.max_gate_count == other.max_gate_count
         
         for w in self._data:
             for gc in self._data[w]:
                 if other._data[w][gc]:
-                    if self._data[w][gc] is None:
-                        self._data[w][gc] = ECA57DimGroup(w, gc)
-                    self._data[w][gc].join(other._data[w][gc])
+                    self.group_or_new(w, gc).join(other._data[w][gc])
     
     def fill_empty_line_extensions(self) -> "ECA57Collection":
         """Extend circuits by adding spectator wires up to max_width.
@@ -178,7 +196,7 @@ class ECA57Collection:
         """
         from gates.eca57 import ECA57Circuit
         
-        extensions = ECA57Collection(self._max_width, self._max_gate_count)
+        extensions = ECA57Collection(self.max_width, self.max_gate_count)
         
         for w in sorted(self._data.keys()):
             for gc in sorted(self._data[w].keys()):
@@ -187,27 +205,30 @@ class ECA57Collection:
                     continue
                 print(f"  -- FEL({w}, {gc})")
                 for circ in dg:
-                    for target_width in range(w + 1, self._max_width + 1):
+                    for target_width in range(w + 1, self.max_width + 1):
                         new_extensions = circ.empty_line_extensions(target_width)
-                        if extensions._data[target_width][gc] is None:
-                            extensions._data[target_width][gc] = ECA57DimGroup(target_width, gc)
-                        extensions._data[target_width][gc].extend(new_extensions)
+                        extensions.group_or_new(target_width, gc).extend(new_extensions)
         
         self.join(extensions)
         return self
     
     def remove_reducibles(self) -> "ECA57Collection":
-        """Remove circuits containing smaller identity templates as subcircuits."""
+        """Remove circuits containing smaller identity templates as subcircuits.
+        
+        Gate counts are processed in ascending order, so each DimGroup is
+        scanned once against the (already reduced) reductors of every
+        smaller gate count of the same width.
+        """
         for w in sorted(self._data.keys()):
-            for reducing_gc in sorted(self._data[w].keys()):
-                reducing_dg = self._data[w][reducing_gc]
-                if not reducing_dg:
+            reductor_keys = {}
+            for gc in sorted(self._data[w].keys()):
+                dg = self._data[w][gc]
+                if not dg:
                     continue
-                print(f"  -- RMR({w}, {reducing_gc})")
-                for reducted_gc in range(reducing_gc + 1, self._max_gate_count + 1):
-                    reducted_dg = self._data[w][reducted_gc]
-                    if reducted_dg:
-                        reducted_dg.remove_reducibles(reducing_dg)
+                print(f"  -- RMR({w}, {gc})")
+                if reductor_keys:
+                    dg.remove_containing(reductor_keys)
+                reductor_keys[gc] = dg.gate_keys()
         return self
     
     def remove_duplicates(self) -> "ECA57Collection":
@@ -5,11 +5,12 @@ Supports the unroll-exclude synthesis pattern.
 """
 from __future__ import annotations
 
-from typing import List, Iterator, TYPE_CHECKING
+from typing import Dict, List, Iterator, Set, Tuple, TYPE_CHECKING
+
 from gates.eca57 import ECA57Circuit
 
 if TYPE_CHECKING:
-    pass
+    import numpy as np
 
 
 class ECA57DimGroup:
@@ -19,16 +20,18 @@ class ECA57DimGroup:
     and gates. This enables efficient grouping for synthesis enumeration.
     
     Attributes:
-        _width: Number of wires for all circuits.
-        _gate_count: Number of gates for all circuits.
+        width: Number of wires for all circuits.
+        gate_count: Number of gates for all circuits.
         _circuits: List of ECA57Circuit objects.
     """
     
+    __slots__ = ("width", "gate_count", "_circuits")
+    
     def __init__(self, width: int, gate_count: int):
         """Create an empty DimGroup for the given dimensions."""
         assert width >= 3, "ECA57 requires at least 3 wires"
-        self._width = width
-        self._gate_count = gate_count
+        self.width = width
+        self.gate_count = gate_count
         self._circuits: List[ECA57Circuit] = []
     
     def __len__(self) -> int:
@@ -43,23 +46,15 @@ class ECA57DimGroup:
     def __iter__(self) -> Iterator[ECA57Circuit]:
         return iter(self._circuits)
     
-    @property
-    def width(self) -> int:
-        return self._width
-    
-    @property
-    def gate_count(self) -> int:
-        return self._gate_count
-    
     def _validate_circuit(self, circuit: ECA57Circuit) -> None:
         """Validate that circuit matches this group's dimensions."""
-        msg = f"({self._width}, {self._gate_count}) != ({circuit.width()}, {len(circuit)})"
-        assert (self._width, self._gate_count) == (circuit.width(), len(circuit)), msg
+        msg = f"({self.width}, {self.gate_count}) != ({circuit.width()}, {len(circuit)})"
+        assert (self.width, self.gate_count) == (circuit.width(), len(circuit)), msg
     
     def _validate_dimgroup(self, other: "ECA57DimGroup") -> None:
         """Validate that other group has same dimensions."""
-        msg = f"({self._width}, {self._gate_count}) != ({other._width}, {other._gate_count})"
-        assert (self._width, self._gate_count) == (other._width, other._gate_count), msg
+        msg = f"({self.width}, {self.gate_count}) != ({other.width}, {other.gate_count})"
+        assert (self.width, self.gate_count) == (other.width, other.gate_count), msg
     
     def append(self, circuit: ECA57Circuit) -> None:
         """Add a circuit to the group (validates dimensions match)."""
@@ -71,6 +66,17 @@ class ECA57DimGroup:
         for circ in circuits:
             self.append(circ)
     
+    def min_slices(self) -> "ECA57DimGroup":
+        """Return the min_slice of every circuit as one group.
+        
+        All circuits share a gate count, so the slice length and the result's
+        dimensions are fixed up front and circuits skip per-circuit validation.
+        """
+        exc_gc = self.gate_count // 2 + 1
+        result = ECA57DimGroup(self.width, exc_gc)
+        result._circuits = [circ.slice(0, exc_gc) for circ in self._circuits]
+        return result
+    
     def join(self, other: "ECA57DimGroup") -> None:
         """Merge another DimGroup's circuits into this group."""
         self._validate_dimgroup(other)
@@ -85,31 +91,41 @@ class ECA57DimGroup:
         Args:
             reductors: DimGroup of smaller circuits to check.
         """
-        assert reductors._width == self._width
-        assert reductors._gate_count <= self._gate_count
+        assert reductors.width == self.width
+        assert reductors.gate_count <= self.gate_count
+        self.remove_containing({reductors.gate_count: reductors.gate_keys()})
+    
+    def remove_containing(self, keys_by_len: Dict[int, Set[tuple]]) -> None:
+        """Remove circuits containing any of the given gate sequences.
         
+        Every window of each circuit is looked up in the hash set for its
+        length, so a circuit is scanned once regardless of how many
+        reductors there are.
+        
+        Args:
+            keys_by_len: Gate-tuple keys (see gate_keys) grouped by length.
+        """
+        lookups = [(n, keys) for n, keys in keys_by_len.items() if keys]
         irreducible = []
         for circ in self._circuits:
-            is_reducible = False
-            for red in reductors._circuits:
-                if self._contains_subcircuit(circ, red):
-                    is_reducible = True
-                    break
-            if not is_reducible:
+            gates = tuple(g.to_tuple() for g in circ.gates())
+            if not self._has_window(gates, lookups):
                 irreducible.append(circ)
         self._circuits = irreducible
     
-    def _contains_subcircuit(self, outer: ECA57Circuit, inner: ECA57Circuit) -> bool:
-        """Check if outer contains inner as contiguous gate subsequence."""
-        outer_gates = [g.to_tuple() for g in outer.gates()]
-        inner_gates = [g.to_tuple() for g in inner.gates()]
-        
-        inner_len = len(inner_gates)
-        for i in range(len(outer_gates) - inner_len + 1):
-            if outer_gates[i:i + inner_len] == inner_gates:
-                return True
+    @staticmethod
+    def _has_window(gates: tuple, lookups: List[Tuple[int, Set[tuple]]]) -> bool:
+        """Check if any contiguous window of gates is in its length's key set."""
+        for n, keys in lookups:
+            for i in range(len(gates) - n + 1):
+                if gates[i:i + n] in keys:
+                    return True
         return False
     
+    def gate_keys(self) -> Set[tuple]:
+        """Return the set of gate-tuple keys of all circuits in the group."""
+        return {tuple(g.to_tuple() for g in c.gates()) for c in self._circuits}
+    
     def remove_duplicates(self) -> None:
         """Remove duplicate circuits (by canonical key)."""
         seen = set()
@@ -125,11 +141,18 @@ class ECA57DimGroup:
         """Return list of all circuits."""
         return self._circuits.copy()
     
+    def to_array(self) -> np.ndarray:
+        """Return all circuits as a uint8 array of shape (len, gate_count, 3)."""
+        import numpy as np
+        
+        rows = [[g.to_tuple() for g in circ.gates()] for circ in self._circuits]
+        return np.array(rows, dtype=np.uint8).reshape(len(rows), self.gate_count, 3)
+    
     def to_dict(self) -> dict:
         """Serialize to dictionary for storage."""
         return {
-            "width": self._width,
-            "gate_count": self._gate_count,
+            "width": self.width,
+            "gate_count": self.gate_count,
             "circuits": [
                 [g.to_tuple() for g in c.gates()]
                 for c in self._circuits
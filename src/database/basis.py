@@ -5,17 +5,27 @@ with a concrete implementation for ECA57.
 """
 from __future__ import annotations
 
+import struct
 from abc import ABC, abstractmethod
 from typing import Protocol, TypeVar, Generic, Any, runtime_checkable
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
 
 import blake3
+import numpy as np
 
 
 # Basis IDs (unique per gate family)
 BASIS_ECA57 = 1
 BASIS_MCT = 2  # Placeholder for future
 
+# Canonical hash size: truncated BLAKE3 (128 bits is ample for < 2^40 templates)
+HASH_SIZE = 16
+
+# Little-endian 64-bit prefilter token from the head of a digest
+_U64 = struct.Struct("<Q").unpack_from
+
 
 @runtime_checkable
 class Gate(Protocol):
@@ -69,7 +79,16 @@ class GateBasis(Protocol):
         - Stable across versions (bump canonicalization_version if changed)
         
         Returns:
-            Tuple of (canonicalized gate list, 32-byte BLAKE3 hash)
+            Tuple of (canonicalized gate list, HASH_SIZE-byte BLAKE3 hash)
+        """
+        ...
+    
+    def window_token(self, window: tuple, width: int) -> int:
+        """64-bit prefilter token of a short window of gates.
+        
+        Must equal the first 8 bytes (little-endian) of
+        canonicalize(list(window), width)'s hash; implementations can skip
+        building the canonical gate list.
         """
         ...
 
@@ -85,13 +104,10 @@ class ECA57Basis:
     Two ECA57 gates commute iff they share no wires.
     """
     
-    @property
-    def basis_id(self) -> int:
-        return BASIS_ECA57
+    __slots__ = ()
     
-    @property
-    def name(self) -> str:
-        return "eca57"
+    basis_id: int = BASIS_ECA57
+    name: str = "eca57"
     
     def invert(self, gate) -> Any:
         """ECA57 gates are self-inverse."""
@@ -138,37 +154,47 @@ class ECA57Basis:
             # Empty circuit
             hasher = blake3.blake3()
             hasher.update(b"eca57:0:")
-            return [], hasher.digest()
+            return [], hasher.digest(length=HASH_SIZE)
         
-        # Build wire relabeling based on first occurrence
-        wire_map = {}
-        next_wire = 0
-        
-        for gate in gates:
-            for wire in self.touched_wires(gate):
-                if wire not in wire_map:
-                    wire_map[wire] = next_wire
-                    next_wire += 1
-        
-        # Remap gates
+        # Build wire relabeling based on first occurrence; setdefault
+        # assigns the next label to each new wire in one pass
+        wire_map: dict = {}
         canonical_gates = []
         for gate in gates:
-            wires = self.touched_wires(gate)
-            new_t = wire_map[wires[0]]
-            new_c1 = wire_map[wires[1]]
-            new_c2 = wire_map[wires[2]]
-            
-            # Create canonical tuple representation
-            canonical_gates.append((new_t, new_c1, new_c2))
+            t, c1, c2 = gate[:3] if type(gate) is tuple else self.touched_wires(gate)
+            canonical_gates.append((
+                wire_map.setdefault(t, len(wire_map)),
+                wire_map.setdefault(c1, len(wire_map)),
+                wire_map.setdefault(c2, len(wire_map)),
+            ))
         
-        # Build hash
-        hasher = blake3.blake3()
-        hasher.update(f"eca57:{width}:{len(gates)}:".encode())
+        # Hash header + packed gates in one call (same digest as streaming)
+        hasher = blake3.blake3(
+            f"eca57:{width}:{len(gates)}:".encode()
+            + bytes(chain.from_iterable(canonical_gates))
+        )
         
-        for g in canonical_gates:
-            hasher.update(self.serialize_gate(g))
-        
-        return canonical_gates, hasher.digest()
+        return canonical_gates, hasher.digest(length=HASH_SIZE)
+    
+    def window_token(self, window: tuple, width: int) -> int:
+        """Prefilter token of a window of (t, c1, c2) tuples (see GateBasis)."""
+        return _eca57_window_token(window, width)
+
+
+@lru_cache(maxsize=1 << 16)
+def _eca57_window_token(window: tuple, width: int) -> int:
+    """ECA57Basis.window_token, memoized.
+    
+    Inlines canonicalize (first-occurrence relabel, then BLAKE3 of the same
+    prefix and bytes) and reads only the 8 token bytes. The same raw
+    windows recur across the templates of a width.
+    """
+    wire_map: dict = {}
+    data = bytearray(f"eca57:{width}:{len(window)}:".encode())
+    for gate in window:
+        for wire in gate:
+            data.append(wire_map.setdefault(wire, len(wire_map)))
+    return _U64(blake3.blake3(data).digest(length=8))[0]
 
 
 class MCTBasis:
@@ -177,13 +203,10 @@ class MCTBasis:
     TODO: Implement when needed.
     """
     
-    @property
-    def basis_id(self) -> int:
-        return BASIS_MCT
+    __slots__ = ()
     
-    @property
-    def name(self) -> str:
-        return "mct"
+    basis_id: int = BASIS_MCT
+    name: str = "mct"
     
     def invert(self, gate) -> Any:
         raise NotImplementedError("MCT basis not yet implemented")
@@ -199,19 +222,26 @@ class MCTBasis:
     
     def canonicalize(self, gates: list, width: int) -> tuple[list, bytes]:
         raise NotImplementedError("MCT basis not yet implemented")
+    
+    def window_token(self, window: tuple, width: int) -> int:
+        raise NotImplementedError("MCT basis not yet implemented")
+
+
+# Bases are stateless, so one shared instance per family is enough
+_ECA57_BASIS = ECA57Basis()
+_MCT_BASIS = MCTBasis()
+_BASES = {"eca57": _ECA57_BASIS, "mct": _MCT_BASIS}
 
 
 def get_basis(name: str) -> GateBasis:
-    """Get basis implementation by name."""
-    if name == "eca57":
-        return ECA57Basis()
-    elif name == "mct":
-        return MCTBasis()
-    else:
+    """Get the shared basis implementation by name."""
+    basis = _BASES.get(name)
+    if basis is None:
         raise ValueError(f"Unknown basis: {name}")
+    return basis
 
 
-def canonical_hash_256(gates: list, width: int, basis: GateBasis) -> bytes:
+def canonical_hash(gates: list, width: int, basis: GateBasis) -> bytes:
     """Convenience function to get canonical hash of a circuit.
     
     Args:
@@ -220,7 +250,48 @@ def canonical_hash_256(gates: list, width: int, basis: GateBasis) -> bytes:
         basis: Gate basis implementation.
         
     Returns:
-        32-byte canonical hash.
+        HASH_SIZE-byte canonical hash.
     """
     _, hash_bytes = basis.canonicalize(gates, width)
     return hash_bytes
+
+
+def batch_canonicalize(gates: np.ndarray, width: int) -> tuple[np.ndarray, np.ndarray]:
+    """Canonicalize many equal-length ECA57 circuits at once.
+    
+    Vectorized equivalent of ECA57Basis.canonicalize: the first-occurrence
+    wire relabeling is computed for all circuits with array operations and
+    only the final BLAKE3 call remains per circuit.
+    
+    Args:
+        gates: Array of shape (K, n, 3) holding (target, ctrl1, ctrl2) rows.
+        width: Number of wires (part of the hash prefix).
+        
+    Returns:
+        Tuple of (canonical gates as uint8 array (K, n, 3), hashes as
+        uint8 array (K, HASH_SIZE)), matching canonicalize row by row.
+    """
+    assert gates.ndim == 3 and gates.shape[2] == 3
+    k, n, _ = gates.shape
+    if k == 0:
+        return np.zeros((0, n, 3), dtype=np.uint8), np.zeros((0, HASH_SIZE), dtype=np.uint8)
+    if n == 0:
+        digest = blake3.blake3(b"eca57:0:").digest(length=HASH_SIZE)
+        hashes = np.tile(np.frombuffer(digest, dtype=np.uint8), (k, 1))
+        return np.zeros((k, 0, 3), dtype=np.uint8), hashes
+    
+    flat = gates.reshape(k, 3 * n).astype(np.intp)
+    num_wires = int(flat.max()) + 1
+    
+    # First position of every wire in each circuit (absent wires sort last)
+    seen = flat[:, :, None] == np.arange(num_wires)
+    first = np.where(seen.any(axis=1), seen.argmax(axis=1), 3 * n)
+    labels = np.argsort(np.argsort(first, axis=1, kind="stable"), axis=1)
+    canonical = np.take_along_axis(labels, flat, axis=1).astype(np.uint8)
+    
+    prefix = f"eca57:{width}:{n}:".encode()
+    hashes = np.empty((k, HASH_SIZE), dtype=np.uint8)
+    for i, row in enumerate(canonical):
+        digest = blake3.blake3(prefix + row.tobytes()).digest(length=HASH_SIZE)
+        hashes[i] = np.frombuffer(digest, dtype=np.uint8)
+    return canonical.reshape(k, n, 3), hashes
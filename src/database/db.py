@@ -5,12 +5,15 @@ with automatic equivalence class computation.
 """
 from __future__ import annotations
 
+import os
 import sqlite3
-import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING, Optional, Iterator
 
-from database.schema import SCHEMA_SQL
+from database.schema import PRAGMA_SQL, SCHEMA_SQL, SCHEMA_VERSION
 from database.equivalence import (
     get_invariants,
     invariants_hash,
@@ -18,12 +21,114 @@ from database.equivalence import (
     compute_equivalence_class,
     select_representative,
     canonical_repr,
+    canonical_repr_from_tuple,
+    pack_gates,
+    unpack_gates,
 )
 
 if TYPE_CHECKING:
     from circuit.circuit import Circuit
 
 
+@dataclass(slots=True)
+class CircuitRow:
+    """One row of the circuits table.
+    
+    Attributes:
+        id: Circuit ID.
+        equivalence_class_id: ID of the circuit's equivalence class.
+        canonical_repr: Packed canonical gates (see pack_gates).
+        gate_list: Original gate list, packed with pack_gates.
+        width: Number of wires.
+        gate_count: Number of gates.
+        is_representative: Whether the circuit represents its class.
+        truth_table_hash: Optional truth table hash.
+        created_at: Insertion timestamp.
+    """
+    id: int
+    equivalence_class_id: int
+    canonical_repr: bytes
+    gate_list: bytes
+    width: int
+    gate_count: int
+    is_representative: bool
+    truth_table_hash: Optional[str]
+    created_at: str
+    
+    def gates(self) -> tuple:
+        """Decode gate_list into the circuit_to_tuple form."""
+        return unpack_gates(self.gate_list)
+
+
+# Statements are module constants so sqlite3's statement cache always hits
+_SQL_LOOKUP_CIRCUIT = "SELECT id, equivalence_class_id FROM circuits WHERE canonical_repr = ?"
+_SQL_LOOKUP_CIRCUITS_IN = (
+    "SELECT id, equivalence_class_id, canonical_repr FROM circuits WHERE canonical_repr IN ({})"
+)
+_SQL_LOOKUP_RAW = "SELECT id, equivalence_class_id FROM circuits WHERE gate_list = ? AND width = ?"
+_SQL_LOOKUP_RAW_IN = (
+    "SELECT id, equivalence_class_id, gate_list, width FROM circuits WHERE gate_list IN ({})"
+)
+_SQL_LOOKUP_CLASS = (
+    "SELECT id FROM equivalence_classes "
+    "WHERE invariant_hash = ? AND width = ? AND gate_count = ?"
+)
+_SQL_INSERT_CLASS = (
+    "INSERT INTO equivalence_classes (width, gate_count, invariant_hash, class_size) "
+    "VALUES (?, ?, ?, ?)"
+)
+_SQL_ADD_CLASS_SIZE = "UPDATE equivalence_classes SET class_size = class_size + ? WHERE id = ?"
+_SQL_INSERT_CIRCUIT = (
+    "INSERT INTO circuits (equivalence_class_id, canonical_repr, gate_list, width, gate_count) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_SQL_INSERT_CIRCUIT_OR_IGNORE = _SQL_INSERT_CIRCUIT.replace("INSERT", "INSERT OR IGNORE", 1)
+_SQL_CLASS_REPRESENTATIVE = "SELECT representative_id FROM equivalence_classes WHERE id = ?"
+_SQL_SET_REPRESENTATIVE = "UPDATE equivalence_classes SET representative_id = ? WHERE id = ?"
+_SQL_MARK_REPRESENTATIVE = "UPDATE circuits SET is_representative = TRUE WHERE id = ?"
+
+# Column order matches CircuitRow so rows can be unpacked positionally
+_CIRCUIT_COLUMNS = (
+    "id, equivalence_class_id, canonical_repr, gate_list, width, gate_count, "
+    "is_representative, truth_table_hash, created_at"
+)
+_SQL_CIRCUIT_BY_ID = f"SELECT {_CIRCUIT_COLUMNS} FROM circuits WHERE id = ?"
+_SQL_CLASS_REPRESENTATIVE_ROW = (
+    f"SELECT {', '.join('c.' + col for col in _CIRCUIT_COLUMNS.split(', '))} FROM circuits c "
+    "JOIN equivalence_classes ec ON c.id = ec.representative_id WHERE ec.id = ?"
+)
+_SQL_BY_WIDTH_GC = f"SELECT {_CIRCUIT_COLUMNS} FROM circuits WHERE width = ? AND gate_count = ?"
+
+
+def _filter_variants(base: str) -> dict:
+    """Precompute a query's optional width/gate_count filter variants.
+    
+    Keyed by (width is given, gate_count is given).
+    """
+    return {
+        (False, False): base,
+        (True, False): base + " AND width = ?",
+        (False, True): base + " AND gate_count = ?",
+        (True, True): base + " AND width = ? AND gate_count = ?",
+    }
+
+
+_SQL_REPRESENTATIVES = _filter_variants(
+    f"SELECT {_CIRCUIT_COLUMNS} FROM circuits WHERE is_representative = TRUE"
+)
+_SQL_COUNT_CIRCUITS = _filter_variants("SELECT COUNT(*) FROM circuits WHERE 1=1")
+_SQL_COUNT_CLASSES = _filter_variants("SELECT COUNT(*) FROM equivalence_classes WHERE 1=1")
+
+# Batches smaller than this are canonicalized in-process (pool startup dominates)
+_PARALLEL_MIN_BATCH = 256
+
+
+def _canonical_repr_worker(payload: tuple[int, tuple]) -> bytes:
+    """Process-pool entry point: canonical_repr from (width, circuit_to_tuple)."""
+    width, gates = payload
+    return canonical_repr_from_tuple(width, gates)
+
+
 class CircuitDatabase:
     """SQLite-backed database for circuits with equivalence class tracking.
     
@@ -45,9 +150,23 @@ class CircuitDatabase:
         self._init_schema()
     
     def _init_schema(self):
-        """Create database tables if they don't exist."""
+        """Create database tables if they don't exist.
+        
+        Raises:
+            ValueError: If the file holds tables from an older schema
+                (CREATE TABLE IF NOT EXISTS would silently keep them).
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION and self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'circuits'"
+        ).fetchone():
+            self.conn.close()
+            raise ValueError(
+                f"Database {self.db_path} has schema version {version}, "
+                f"this code expects {SCHEMA_VERSION}; rebuild the database"
+            )
+        self.conn.executescript(PRAGMA_SQL)
         self.conn.executescript(SCHEMA_SQL)
-        self.conn.commit()
     
     def close(self):
         """Close database connection."""
@@ -62,7 +181,8 @@ class CircuitDatabase:
     def add_circuit(
         self, 
         circuit: "Circuit", 
-        compute_class: bool = True
+        compute_class: bool = True,
+        commit: bool = True
     ) -> tuple[int, int]:
         """Add a circuit to the database.
         
@@ -70,26 +190,32 @@ class CircuitDatabase:
             circuit: The circuit to add.
             compute_class: If True, compute equivalence class and representative.
                           If False, just add the circuit with a new equivalence class.
+            commit: If True, commit after inserting. Batch callers pass False
+                    and commit once for the whole batch.
         
         Returns:
             Tuple of (circuit_id, equivalence_class_id).
         """
+        width = circuit.width()
+        gate_list = pack_gates(circuit_to_tuple(circuit))
+        
+        # Exact re-insert: found without canonicalizing
+        existing = self.conn.execute(_SQL_LOOKUP_RAW, (gate_list, width)).fetchone()
+        
+        if existing:
+            return (existing["id"], existing["equivalence_class_id"])
+        
         # Get canonical representation
-        canon_str = canonical_repr(circuit)
+        canon_key = canonical_repr(circuit)
         
-        # Check if circuit already exists
-        existing = self.conn.execute(
-            "SELECT id, equivalence_class_id FROM circuits WHERE canonical_repr = ?",
-            (canon_str,)
-        ).fetchone()
+        # Check if an equivalent circuit already exists
+        existing = self.conn.execute(_SQL_LOOKUP_CIRCUIT, (canon_key,)).fetchone()
         
         if existing:
             return (existing["id"], existing["equivalence_class_id"])
         
         # Get circuit properties
-        width = circuit.width()
         gate_count = len(circuit)
-        gate_list_json = json.dumps(circuit_to_tuple(circuit))
         inv_hash = invariants_hash(circuit)
         
         # Find or create equivalence class
@@ -98,119 +224,238 @@ class CircuitDatabase:
         if compute_class:
             # Check for existing class with same invariants
             equiv_class_row = cursor.execute(
-                """SELECT id FROM equivalence_classes 
-                   WHERE invariant_hash = ? AND width = ? AND gate_count = ?""",
-                (inv_hash, width, gate_count)
+                _SQL_LOOKUP_CLASS, (inv_hash, width, gate_count)
             ).fetchone()
             
             if equiv_class_row:
                 equiv_class_id = equiv_class_row["id"]
                 # Increment class size
-                cursor.execute(
-                    "UPDATE equivalence_classes SET class_size = class_size + 1 WHERE id = ?",
-                    (equiv_class_id,)
-                )
+                cursor.execute(_SQL_ADD_CLASS_SIZE, (1, equiv_class_id))
             else:
                 # Create new equivalence class
-                cursor.execute(
-                    """INSERT INTO equivalence_classes 
-                       (width, gate_count, invariant_hash, class_size)
-                       VALUES (?, ?, ?, 1)""",
-                    (width, gate_count, inv_hash)
-                )
+                cursor.execute(_SQL_INSERT_CLASS, (width, gate_count, inv_hash, 1))
                 equiv_class_id = cursor.lastrowid
         else:
             # Create new equivalence class for this circuit
-            cursor.execute(
-                """INSERT INTO equivalence_classes 
-                   (width, gate_count, invariant_hash, class_size)
-                   VALUES (?, ?, ?, 1)""",
-                (width, gate_count, inv_hash)
-            )
+            cursor.execute(_SQL_INSERT_CLASS, (width, gate_count, inv_hash, 1))
             equiv_class_id = cursor.lastrowid
         
         # Insert circuit
         cursor.execute(
-            """INSERT INTO circuits 
-               (equivalence_class_id, canonical_repr, gate_list, width, gate_count)
-               VALUES (?, ?, ?, ?, ?)""",
-            (equiv_class_id, canon_str, gate_list_json, width, gate_count)
+            _SQL_INSERT_CIRCUIT,
+            (equiv_class_id, canon_key, gate_list, width, gate_count)
         )
         circuit_id = cursor.lastrowid
         
         # Set as representative if this is first circuit in class
-        existing_rep = cursor.execute(
-            "SELECT representative_id FROM equivalence_classes WHERE id = ?",
-            (equiv_class_id,)
-        ).fetchone()
+        existing_rep = cursor.execute(_SQL_CLASS_REPRESENTATIVE, (equiv_class_id,)).fetchone()
         
         if existing_rep and existing_rep["representative_id"] is None:
-            cursor.execute(
-                """UPDATE equivalence_classes SET representative_id = ? WHERE id = ?""",
-                (circuit_id, equiv_class_id)
-            )
-            cursor.execute(
-                "UPDATE circuits SET is_representative = TRUE WHERE id = ?",
-                (circuit_id,)
-            )
+            cursor.execute(_SQL_SET_REPRESENTATIVE, (circuit_id, equiv_class_id))
+            cursor.execute(_SQL_MARK_REPRESENTATIVE, (circuit_id,))
         
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
         return (circuit_id, equiv_class_id)
     
     def add_circuits_batch(
         self, 
         circuits: list["Circuit"],
-        compute_class: bool = True
+        compute_class: bool = True,
+        workers: Optional[int] = None
     ) -> list[tuple[int, int]]:
         """Add multiple circuits efficiently.
         
+        Equivalent to calling add_circuit for each circuit in order, but
+        set-based: existing circuits are looked up in bulk, new circuits are
+        written with one executemany, and class sizes and representatives
+        are updated with one grouped statement each. Everything runs in a
+        single transaction that is rolled back if any step fails.
+        
+        Canonicalization dominates the cost and is independent per circuit,
+        so circuits already stored verbatim skip it, and large batches
+        compute it in a process pool before the (serial) database writes.
+        
         Args:
             circuits: List of circuits to add.
             compute_class: Whether to compute equivalence classes.
+            workers: Canonicalization processes. None uses os.cpu_count()
+                     for batches of at least 256 circuits; 1 stays in-process.
             
         Returns:
             List of (circuit_id, equivalence_class_id) tuples.
         """
-        results = []
-        for circuit in circuits:
-            results.append(self.add_circuit(circuit, compute_class))
+        try:
+            # Circuits stored verbatim need no canonicalization
+            found = self._lookup_stored(circuits)
+            pending = [circuit for circuit, ids in zip(circuits, found) if ids is None]
+            canons = self._canonicalize_batch(pending, workers)
+            added = iter(self._add_circuits_batch(pending, canons, compute_class))
+            results = [ids if ids is not None else next(added) for ids in found]
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        # Refresh planner statistics (cheap no-op when nothing changed much)
+        self.conn.execute("PRAGMA optimize")
         return results
     
-    def get_circuit_by_id(self, circuit_id: int) -> Optional[dict]:
+    def _lookup_stored(self, circuits: list["Circuit"]) -> list[Optional[tuple[int, int]]]:
+        """IDs of circuits whose exact gate list is already stored, else None."""
+        raws = [(pack_gates(circuit_to_tuple(circuit)), circuit.width()) for circuit in circuits]
+        stored = {
+            (row["gate_list"], row["width"]): (row["id"], row["equivalence_class_id"])
+            for row in self._select_in(_SQL_LOOKUP_RAW_IN, list({raw for raw, _ in raws}))
+        }
+        return [stored.get(raw) for raw in raws]
+    
+    @staticmethod
+    def _canonicalize_batch(circuits: list["Circuit"], workers: Optional[int]) -> list[bytes]:
+        """Compute canonical_repr for every circuit, in parallel if worthwhile."""
+        if workers is None:
+            workers = os.cpu_count() if len(circuits) >= _PARALLEL_MIN_BATCH else 1
+        if workers <= 1:
+            return [canonical_repr(circuit) for circuit in circuits]
+        
+        payloads = [(circuit.width(), circuit_to_tuple(circuit)) for circuit in circuits]
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(_canonical_repr_worker, payloads, chunksize=64))
+    
+    def _add_circuits_batch(
+        self,
+        circuits: list["Circuit"],
+        canons: list[bytes],
+        compute_class: bool
+    ) -> list[tuple[int, int]]:
+        """Insert a batch of circuits with precomputed canonical keys, without committing."""
+        cursor = self.conn.cursor()
+        
+        # Circuits already stored: canon -> (circuit_id, equiv_class_id)
+        ids = {
+            row["canonical_repr"]: (row["id"], row["equivalence_class_id"])
+            for row in self._select_in(
+                _SQL_LOOKUP_CIRCUITS_IN,
+                list(set(canons)),
+            )
+        }
+        
+        # New circuits in first-seen order: canon -> (width, gate_count, inv_hash, gate_list)
+        new = {}
+        for canon, circuit in zip(canons, circuits):
+            if canon not in ids and canon not in new:
+                new[canon] = (
+                    circuit.width(),
+                    len(circuit),
+                    invariants_hash(circuit),
+                    pack_gates(circuit_to_tuple(circuit)),
+                )
+        
+        if new:
+            # Resolve an equivalence class for every new circuit
+            class_of = {}
+            if compute_class:
+                keys = {(h, w, gc) for w, gc, h, _ in new.values()}
+                class_ids = {}
+                for row in self._select_in(
+                    "SELECT id, invariant_hash, width, gate_count FROM equivalence_classes "
+                    "WHERE invariant_hash IN ({}) ORDER BY id",
+                    list({h for h, _, _ in keys}),
+                ):
+                    key = (row["invariant_hash"], row["width"], row["gate_count"])
+                    if key in keys:
+                        class_ids.setdefault(key, row["id"])
+                for canon, (w, gc, h, _) in new.items():
+                    if (h, w, gc) not in class_ids:
+                        class_ids[(h, w, gc)] = self._insert_equivalence_class(cursor, h, w, gc)
+                    class_of[canon] = class_ids[(h, w, gc)]
+            else:
+                for canon, (w, gc, h, _) in new.items():
+                    class_of[canon] = self._insert_equivalence_class(cursor, h, w, gc)
+            
+            cursor.executemany(
+                _SQL_INSERT_CIRCUIT_OR_IGNORE,
+                [(class_of[c], c, gl, w, gc) for c, (w, gc, _, gl) in new.items()]
+            )
+            for row in self._select_in(
+                _SQL_LOOKUP_CIRCUITS_IN,
+                list(new),
+            ):
+                ids[row["canonical_repr"]] = (row["id"], row["equivalence_class_id"])
+            
+            # One grouped update for class sizes
+            added = Counter(class_of.values())
+            cursor.executemany(_SQL_ADD_CLASS_SIZE, [(n, cid) for cid, n in added.items()])
+            
+            # First new circuit of a class without representative becomes it
+            first_new = {}
+            for canon in new:
+                first_new.setdefault(class_of[canon], ids[canon][0])
+            missing = {
+                row["id"]
+                for row in self._select_in(
+                    "SELECT id FROM equivalence_classes "
+                    "WHERE representative_id IS NULL AND id IN ({})",
+                    list(first_new),
+                )
+            }
+            reps = [(cid, eq_id) for eq_id, cid in first_new.items() if eq_id in missing]
+            cursor.executemany(_SQL_SET_REPRESENTATIVE, reps)
+            cursor.executemany(_SQL_MARK_REPRESENTATIVE, [(cid,) for cid, _ in reps])
+        
+        return [ids[canon] for canon in canons]
+    
+    def _insert_equivalence_class(
+        self, cursor: sqlite3.Cursor, inv_hash: str, width: int, gate_count: int
+    ) -> int:
+        """Insert a new, still empty equivalence class and return its ID."""
+        cursor.execute(_SQL_INSERT_CLASS, (width, gate_count, inv_hash, 0))
+        return cursor.lastrowid
+    
+    @staticmethod
+    def _filtered(
+        variants: dict, width: Optional[int], gate_count: Optional[int]
+    ) -> tuple[str, list]:
+        """Pick the precomputed filter variant and its parameters."""
+        params = [v for v in (width, gate_count) if v is not None]
+        return variants[(width is not None, gate_count is not None)], params
+    
+    def _select_in(self, query: str, values: list, chunk_size: int = 500) -> list[sqlite3.Row]:
+        """Run a query with an "IN ({})" placeholder over values in chunks."""
+        rows = []
+        for i in range(0, len(values), chunk_size):
+            chunk = values[i:i + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(self.conn.execute(query.format(placeholders), chunk).fetchall())
+        return rows
+    
+    def get_circuit_by_id(self, circuit_id: int) -> Optional[CircuitRow]:
         """Get circuit record by ID."""
-        row = self.conn.execute(
-            "SELECT * FROM circuits WHERE id = ?",
-            (circuit_id,)
-        ).fetchone()
-        return dict(row) if row else None
+        row = self.conn.execute(_SQL_CIRCUIT_BY_ID, (circuit_id,)).fetchone()
+        return CircuitRow(*row) if row else None
     
-    def get_representative(self, equiv_class_id: int) -> Optional[dict]:
+    def get_representative(self, equiv_class_id: int) -> Optional[CircuitRow]:
         """Get the representative circuit for an equivalence class."""
-        row = self.conn.execute(
-            """SELECT c.* FROM circuits c
-               JOIN equivalence_classes ec ON c.id = ec.representative_id
-               WHERE ec.id = ?""",
-            (equiv_class_id,)
-        ).fetchone()
-        return dict(row) if row else None
+        row = self.conn.execute(_SQL_CLASS_REPRESENTATIVE_ROW, (equiv_class_id,)).fetchone()
+        return CircuitRow(*row) if row else None
     
     def query_by_width_gates(
         self, 
         width: int, 
         gate_count: int
-    ) -> list[dict]:
+    ) -> list[CircuitRow]:
         """Query all circuits with given width and gate count."""
-        rows = self.conn.execute(
-            "SELECT * FROM circuits WHERE width = ? AND gate_count = ?",
-            (width, gate_count)
-        ).fetchall()
-        return [dict(row) for row in rows]
+        return list(self.iter_by_width_gates(width, gate_count))
+    
+    def iter_by_width_gates(self, width: int, gate_count: int) -> Iterator[CircuitRow]:
+        """Stream circuits with given width and gate count without buffering all rows."""
+        for row in self.conn.execute(_SQL_BY_WIDTH_GC, (width, gate_count)):
+            yield CircuitRow(*row)
     
     def query_representatives(
         self, 
         width: Optional[int] = None, 
         gate_count: Optional[int] = None
-    ) -> list[dict]:
+    ) -> list[CircuitRow]:
         """Query representative circuits only.
         
         Args:
@@ -220,18 +465,8 @@ class CircuitDatabase:
         Returns:
             List of representative circuit records.
         """
-        query = "SELECT * FROM circuits WHERE is_representative = TRUE"
-        params = []
-        
-        if width is not None:
-            query += " AND width = ?"
-            params.append(width)
-        if gate_count is not None:
-            query += " AND gate_count = ?"
-            params.append(gate_count)
-        
-        rows = self.conn.execute(query, params).fetchall()
-        return [dict(row) for row in rows]
+        query, params = self._filtered(_SQL_REPRESENTATIVES, width, gate_count)
+        return [CircuitRow(*row) for row in self.conn.execute(query, params)]
     
     def get_equivalence_class_stats(self) -> list[dict]:
         """Get statistics about equivalence classes grouped by (width, gate_count)."""
@@ -251,16 +486,7 @@ class CircuitDatabase:
         gate_count: Optional[int] = None
     ) -> int:
         """Count circuits matching optional filters."""
-        query = "SELECT COUNT(*) FROM circuits WHERE 1=1"
-        params = []
-        
-        if width is not None:
-            query += " AND width = ?"
-            params.append(width)
-        if gate_count is not None:
-            query += " AND gate_count = ?"
-            params.append(gate_count)
-        
+        query, params = self._filtered(_SQL_COUNT_CIRCUITS, width, gate_count)
         return self.conn.execute(query, params).fetchone()[0]
     
     def count_equivalence_classes(
@@ -269,14 +495,5 @@ class CircuitDatabase:
         gate_count: Optional[int] = None
     ) -> int:
         """Count equivalence classes matching optional filters."""
-        query = "SELECT COUNT(*) FROM equivalence_classes WHERE 1=1"
-        params = []
-        
-        if width is not None:
-            query += " AND width = ?"
-            params.append(width)
-        if gate_count is not None:
-            query += " AND gate_count = ?"
-            params.append(gate_count)
-        
+        query, params = self._filtered(_SQL_COUNT_CLASSES, width, gate_count)
         return self.conn.execute(query, params).fetchone()[0]
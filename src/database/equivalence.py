@@ -13,13 +13,20 @@ if no swap sequence connects them.
 from __future__ import annotations
 
 from typing import TYPE_CHECKING
+from collections import deque
 from functools import lru_cache
+from itertools import permutations
 import hashlib
 import json
+import struct
+
+import numpy as np
 
 if TYPE_CHECKING:
     from circuit.circuit import Circuit
 
+_GATE_STRUCT = struct.Struct("<HB")
+
 
 def get_invariants(circuit: "Circuit") -> tuple:
     """Get invariants that are preserved across equivalence operations.
@@ -45,9 +52,18 @@ def get_invariants(circuit: "Circuit") -> tuple:
 
 def invariants_hash(circuit: "Circuit") -> str:
     """Compute a hash of circuit invariants for quick comparison."""
-    invariants = get_invariants(circuit)
+    return _invariants_hash(get_invariants(circuit))
+
+
+@lru_cache(maxsize=4096)
+def _invariants_hash(invariants: tuple) -> str:
+    """Hash an invariants tuple (few distinct values, so cached).
+    
+    Only used as an equality bucket key, so an 8-byte BLAKE2b digest is
+    enough; it yields the same 16 hex characters as before.
+    """
     invariant_str = json.dumps(invariants, sort_keys=True)
-    return hashlib.sha256(invariant_str.encode()).hexdigest()[:16]
+    return hashlib.blake2b(invariant_str.encode(), digest_size=8).hexdigest()
 
 
 def circuit_to_tuple(circuit: "Circuit") -> tuple:
@@ -64,18 +80,29 @@ def tuple_to_gates(t: tuple) -> list:
 
 
 def compute_equivalence_class(circuit: "Circuit") -> list["Circuit"]:
-    """Compute the full equivalence class of a circuit via BFS over unroll operations.
+    """Compute the full equivalence class of a circuit.
     
-    Uses the existing unroll() method which applies swaps, rotations, 
-    reversals, and wire permutations.
+    Same set of circuits as circuit.unroll() (swaps, rotations, reversals
+    and wire permutations), but enumerated on integer gate keys (see
+    _class_keys); Circuit objects are only built for the result.
     
     Args:
         circuit: The circuit to find equivalents for.
         
     Returns:
-        List of all circuits equivalent to the input under unroll operations.
+        List of all circuits equivalent to the input under unroll operations,
+        in lexicographic order of their gate tuples.
     """
-    return circuit.unroll()
+    from circuit.circuit import Circuit
+    
+    width = circuit.width()
+    key_to_gate = _perm_tables(width)[3]
+    equiv_class = []
+    for row in _class_keys(width, circuit_to_tuple(circuit)).tolist():
+        equiv = Circuit(width)
+        equiv._gates = [(list(key_to_gate[k][0]), key_to_gate[k][1]) for k in row]
+        equiv_class.append(equiv)
+    return equiv_class
 
 
 def select_representative(equiv_class: list["Circuit"]) -> "Circuit":
@@ -95,21 +122,36 @@ def select_representative(equiv_class: list["Circuit"]) -> "Circuit":
     if not equiv_class:
         raise ValueError("Cannot select representative from empty class")
     
-    # Convert to tuple form for comparison
-    circuit_tuples = [(circuit_to_tuple(c), c) for c in equiv_class]
-    
-    # Sort by tuple representation
-    circuit_tuples.sort(key=lambda x: x[0])
+    # Integer keys compare like the tuples but in a single int comparison
+    return min(equiv_class, key=circuit_to_int)
+
+
+def circuit_to_int(circuit: "Circuit") -> int:
+    """Pack a circuit into an int ordered like its circuit_to_tuple form.
     
-    return circuit_tuples[0][1]
+    Each gate becomes width fixed digits in base (width + 1): the sorted
+    controls shifted by one and zero-padded to width - 1 digits (so a
+    shorter control tuple that is a prefix sorts first), then the target.
+    Concatenating the gates gives an int whose order among circuits of the
+    same width and gate count matches tuple comparison.
+    """
+    base = circuit.width() + 1
+    pad = circuit.width() - 1
+    key = 0
+    for controls, target in circuit.gates():
+        for c in controls:
+            key = key * base + c + 1
+        for _ in range(pad - len(controls)):
+            key *= base
+        key = key * base + target
+    return key
 
 
 def canonicalize(circuit: "Circuit") -> "Circuit":
     """Return the canonical (lexicographically minimal) form of a circuit.
     
-    This computes the full equivalence class and returns the representative.
-    For circuits where computing the full class is expensive, use 
-    select_representative on a precomputed class.
+    Equal to select_representative(compute_equivalence_class(circuit)),
+    but computed by canonicalize_tuple without materializing the class.
     
     Args:
         circuit: The circuit to canonicalize.
@@ -117,24 +159,204 @@ def canonicalize(circuit: "Circuit") -> "Circuit":
     Returns:
         The canonical representative of the circuit's equivalence class.
     """
-    equiv_class = compute_equivalence_class(circuit)
-    return select_representative(equiv_class)
+    from circuit.circuit import Circuit
+    
+    canon = Circuit(circuit.width())
+    for gate in tuple_to_gates(canonicalize_tuple(circuit.width(), circuit_to_tuple(circuit))):
+        canon.append(gate)
+    return canon
+
+
+def canonicalize_tuple(width: int, gates: tuple) -> tuple:
+    """Return the minimal circuit_to_tuple form over the unroll equivalence class.
+    
+    The class is swap space x rotations x reversal x wire permutations. Only
+    the permutation-free part (swap space closed under rotation and
+    reversal) is enumerated; all w! relabelings of it are produced with
+    table lookups (see _perm_tables) in bounded chunks, keeping a running
+    minimum, so memory is O(class / w!).
+    
+    Args:
+        width: Number of wires.
+        gates: Circuit in circuit_to_tuple form.
+        
+    Returns:
+        Canonical gate tuple with sorted controls.
+    """
+    key_to_gate = _perm_tables(width)[3]
+    return tuple(key_to_gate[k] for k in _canonical_keys(width, gates))
 
 
-def canonical_repr(circuit: "Circuit") -> str:
-    """Get a string representation of the canonical form for database storage.
+def _canonical_keys(width: int, gates: tuple) -> tuple:
+    """Canonical form of canonicalize_tuple as a tuple of gate keys."""
+    if not gates:
+        return ()
+    
+    keys, base_idx = _relabel_keys(width, gates)
+    best = None
+    chunk = max(1, _CANON_CHUNK // base_idx.size)
+    for start in range(0, len(keys), chunk):
+        rows = keys[start:start + chunk][:, base_idx].reshape(-1, len(gates))
+        for col in range(len(gates)):
+            rows = rows[rows[:, col] == rows[:, col].min()]
+        candidate = tuple(rows[0].tolist())
+        if best is None or candidate < best:
+            best = candidate
+    return best
+
+
+def _class_keys(width: int, gates: tuple) -> np.ndarray:
+    """Whole equivalence class as sorted, distinct rows of gate keys."""
+    if not gates:
+        return np.zeros((1, 0), dtype=np.int64)
+    
+    keys, base_idx = _relabel_keys(width, gates)
+    rows = keys[:, base_idx].reshape(-1, len(gates))
+    return np.unique(rows, axis=0)
+
+
+def _relabel_keys(width: int, gates: tuple) -> tuple[np.ndarray, np.ndarray]:
+    """Gate keys of the permutation-free class part under every relabeling.
     
     Returns:
-        JSON string of the canonical gate tuple.
+        Tuple of (keys, base_idx) where keys[p, i] is the order-preserving
+        key of distinct gate i relabeled by permutation p, and each row of
+        base_idx is one circuit of the swap space closed under rotation and
+        reversal, as indices into the distinct gates. keys[:, base_idx]
+        covers the whole class.
     """
-    canon = canonicalize(circuit)
-    return json.dumps(circuit_to_tuple(canon))
+    bases = set()
+    for seq in _swap_space(gates):
+        for shift in range(len(seq)):
+            rotated = seq[shift:] + seq[:shift]
+            bases.add(rotated)
+            bases.add(rotated[::-1])
+    
+    perm_mask, perm_wire, gate_key, _, _ = _perm_tables(width)
+    distinct = list(set(gates))
+    index = {g: i for i, g in enumerate(distinct)}
+    masks = [sum(1 << c for c in controls) for controls, _ in distinct]
+    targets = [target for _, target in distinct]
+    base_idx = np.array([[index[g] for g in base] for base in bases], dtype=np.intp)
+    return gate_key[perm_mask[:, masks], perm_wire[:, targets]], base_idx
+
+
+# Max candidate-key entries materialized at once by canonicalize_tuple
+_CANON_CHUNK = 1 << 20
+
+
+@lru_cache(maxsize=None)
+def _perm_tables(width: int) -> tuple:
+    """Lookup tables for relabeling gates under every wire permutation.
+    
+    Built lazily once per width (width! x 2^width entries).
+    
+    Returns:
+        Tuple of (perm_mask, perm_wire, gate_key, key_to_gate, key_to_packed)
+        where perm_mask[p, mask] is a controls mask relabeled by permutation
+        p, perm_wire[p, w] is wire w relabeled by p, gate_key[mask, target]
+        is an int ordered like ((sorted controls), target) (the same digit
+        scheme as circuit_to_int), key_to_gate inverts gate_key and
+        key_to_packed maps a key to its pack_gates bytes.
+    """
+    perm_wire = np.array(list(permutations(range(width))), dtype=np.intp)
+    all_masks = np.arange(1 << width, dtype=np.intp)
+    perm_mask = np.zeros((len(perm_wire), 1 << width), dtype=np.intp)
+    for b in range(width):
+        perm_mask |= ((all_masks >> b) & 1)[None, :] << perm_wire[:, b:b + 1]
+    
+    base = width + 1
+    gate_key = np.zeros((1 << width, width), dtype=np.int64)
+    key_to_gate = {}
+    key_to_packed = {}
+    for mask in range(1 << width):
+        controls = tuple(c for c in range(width) if mask >> c & 1)
+        prefix = 0
+        for c in controls:
+            prefix = prefix * base + c + 1
+        for _ in range(width - 1 - len(controls)):
+            prefix *= base
+        for target in range(width):
+            if target not in controls:
+                key = prefix * base + target
+                gate_key[mask, target] = key
+                key_to_gate[key] = (controls, target)
+                if width <= 16:
+                    key_to_packed[key] = _GATE_STRUCT.pack(mask, target)
+    return perm_mask, perm_wire, gate_key, key_to_gate, key_to_packed
+
+
+def _swap_space(gates: tuple) -> set:
+    """All gate tuples reachable by swapping commuting (cyclically) adjacent gates."""
+    n = len(gates)
+    visited = {gates}
+    queue = deque([gates])
+    while queue:
+        seq = queue.popleft()
+        for i in range(n):
+            j = (i + 1) % n
+            (lhs_controls, lhs_target), (rhs_controls, rhs_target) = seq[i], seq[j]
+            if seq[i] == seq[j] or lhs_target in rhs_controls or rhs_target in lhs_controls:
+                continue
+            swapped = list(seq)
+            swapped[i], swapped[j] = seq[j], seq[i]
+            swapped = tuple(swapped)
+            if swapped not in visited:
+                visited.add(swapped)
+                queue.append(swapped)
+    return visited
+
+
+def canonical_repr(circuit: "Circuit") -> bytes:
+    """Get a compact binary key of the canonical form for database storage.
+    
+    Returns:
+        Packed canonical gate list (see pack_gates).
+    """
+    return canonical_repr_from_tuple(circuit.width(), circuit_to_tuple(circuit))
+
+
+@lru_cache(maxsize=1 << 16)
+def canonical_repr_from_tuple(width: int, gates: tuple) -> bytes:
+    """canonical_repr of a circuit given as (width, circuit_to_tuple), cached.
+    
+    Takes only picklable values, so it can run in worker processes.
+    """
+    assert width <= 16, "pack_gates supports up to 16 wires"
+    key_to_packed = _perm_tables(width)[4]
+    return b"".join(key_to_packed[k] for k in _canonical_keys(width, gates))
+
+
+def pack_gates(t: tuple) -> bytes:
+    """Pack a gate tuple into 3 bytes per gate: u16 controls mask, u8 target.
+    
+    Supports circuits of up to 16 wires. BLOB keys compare with memcmp in
+    SQLite, which is cheaper than collating JSON text.
+    """
+    out = bytearray()
+    for controls, target in t:
+        mask = 0
+        for c in controls:
+            mask |= 1 << c
+        assert mask < (1 << 16) and target < 16, "pack_gates supports up to 16 wires"
+        out += _GATE_STRUCT.pack(mask, target)
+    return bytes(out)
+
+
+def unpack_gates(data: bytes) -> tuple:
+    """Inverse of pack_gates (controls are returned sorted)."""
+    return tuple(
+        (tuple(c for c in range(16) if mask >> c & 1), target)
+        for mask, target in _GATE_STRUCT.iter_unpack(data)
+    )
 
 
 def are_equivalent(circuit_a: "Circuit", circuit_b: "Circuit") -> bool:
     """Check if two circuits are in the same equivalence class.
     
-    First checks invariants (fast), then computes equivalence class if needed.
+    First checks invariants (fast), then compares canonical forms, which
+    are equal exactly when the circuits are equivalent. Circuits too wide
+    for canonical_repr fall back to a hash-set lookup in the class of a.
     
     Args:
         circuit_a: First circuit.
@@ -147,6 +369,9 @@ def are_equivalent(circuit_a: "Circuit", circuit_b: "Circuit") -> bool:
     if get_invariants(circuit_a) != get_invariants(circuit_b):
         return False
     
+    if circuit_a.width() <= 16:
+        return canonical_repr(circuit_a) == canonical_repr(circuit_b)
+    
     # Compute equivalence class of a and check if b is in it
-    equiv_class_a = compute_equivalence_class(circuit_a)
-    return circuit_b in equiv_class_a
+    equiv_class_a = {circuit_to_tuple(c) for c in compute_equivalence_class(circuit_a)}
+    return circuit_to_tuple(circuit_b) in equiv_class_a
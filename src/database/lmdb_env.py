@@ -10,14 +10,19 @@ Provides a unified interface to LMDB with multiple named databases:
 """
 from __future__ import annotations
 
+import os
 import struct
+import threading
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional, Iterator, Any
+from typing import Optional, Iterable, Iterator, Any
 from dataclasses import dataclass
 from contextlib import contextmanager
 
 import lmdb
 
+from database.basis import HASH_SIZE
+
 
 # Database names
 DB_META = b"meta"
@@ -27,17 +32,50 @@ DB_TEMPLATES_BY_DIMS = b"templates_by_dims"
 DB_WITNESSES_BY_HASH = b"witnesses_by_hash"
 DB_WITNESS_PREFILTER = b"witness_prefilter"
 
+ALL_DBS = [
+    DB_META,
+    DB_TEMPLATES_BY_HASH,
+    DB_TEMPLATE_FAMILIES,
+    DB_TEMPLATES_BY_DIMS,
+    DB_WITNESSES_BY_HASH,
+    DB_WITNESS_PREFILTER,
+]
+
+# ID-list databases store one sorted duplicate per ID instead of a packed list;
+# the duplicates are native u64s compared as integers (MDB_INTEGERDUP)
+DUPSORT_DBS = {DB_TEMPLATE_FAMILIES, DB_WITNESS_PREFILTER}
+
+# Native-endian, as MDB_INTEGERDUP requires
+_ID = struct.Struct("=Q")
+
+# Precompiled key/value layouts
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_KEY_PREFIX = struct.Struct("<BBH")     # basis_id, width, gate_count / witness_len
+_DIMS_KEY = struct.Struct("<BBHQ")       # ... + template_id
+_PREFILTER_KEY = struct.Struct("<BBQ")   # basis_id, width, token_hash
+# basis_id, width, gate_count / witness_len, canonical hash: packed in one call
+_HASH_KEY = struct.Struct(f"<BBH{HASH_SIZE}s")
+
 # Schema version
-SCHEMA_VERSION = 1
-CANONICALIZATION_VERSION = 1
+SCHEMA_VERSION = 4
+CANONICALIZATION_VERSION = 2
 
 
 @dataclass
 class LMDBConfig:
-    """Configuration for LMDB environment."""
+    """Configuration for LMDB environment.
+    
+    bulk_load trades durability for write throughput during offline builds:
+    pages are written through a writable mmap (no write() per page) and
+    commits don't fsync. The environment is synced once on close, so a
+    crash mid-build can lose or corrupt the database and the build must be
+    rerun.
+    """
     map_size: int = 10 * 1024 * 1024 * 1024  # 10 GB default
     max_dbs: int = 10
     readonly: bool = False
+    bulk_load: bool = False
 
 
 class TemplateDBEnv:
@@ -62,44 +100,76 @@ class TemplateDBEnv:
         self.path = Path(path)
         self.config = config or LMDBConfig()
         
+        # Per-thread cached read txn (see cached_read_txn); _generation is
+        # bumped by every write_txn so stale snapshots get replaced
+        self._local = threading.local()
+        self._generation = 0
+        
         # Create directory if needed
         self.path.mkdir(parents=True, exist_ok=True)
         
         # Open environment
+        bulk = self.config.bulk_load and not self.config.readonly
         self._env = lmdb.open(
             str(self.path),
             map_size=self.config.map_size,
             max_dbs=self.config.max_dbs,
             readonly=self.config.readonly,
+            writemap=bulk,
+            metasync=not bulk,
+            sync=not bulk,
+            map_async=bulk,
         )
         
-        # Open named databases
+        # Open named databases. meta goes first so that a database written by
+        # another schema is rejected before the others are opened with
+        # today's flags (a dupsort mismatch fails with MDB_INCOMPATIBLE)
         self._dbs = {}
-        if not self.config.readonly:
-            with self._env.begin(write=True) as txn:
-                for db_name in [
-                    DB_META,
-                    DB_TEMPLATES_BY_HASH,
-                    DB_TEMPLATE_FAMILIES,
-                    DB_TEMPLATES_BY_DIMS,
-                    DB_WITNESSES_BY_HASH,
-                    DB_WITNESS_PREFILTER,
-                ]:
-                    self._dbs[db_name] = self._env.open_db(db_name, txn=txn)
-                
-                # Initialize meta if new
-                self._init_meta(txn)
-        else:
-            with self._env.begin() as txn:
-                for db_name in [
-                    DB_META,
-                    DB_TEMPLATES_BY_HASH,
-                    DB_TEMPLATE_FAMILIES,
-                    DB_TEMPLATES_BY_DIMS,
-                    DB_WITNESSES_BY_HASH,
-                    DB_WITNESS_PREFILTER,
-                ]:
-                    self._dbs[db_name] = self._env.open_db(db_name, txn=txn)
+        try:
+            if not self.config.readonly:
+                with self._env.begin(write=True) as txn:
+                    self._dbs[DB_META] = self._env.open_db(DB_META, txn=txn)
+                    self._check_versions(txn)
+                    for db_name in ALL_DBS:
+                        dupsort = db_name in DUPSORT_DBS
+                        self._dbs[db_name] = self._env.open_db(
+                            db_name, txn=txn, dupsort=dupsort, dupfixed=dupsort, integerdup=dupsort
+                        )
+                    
+                    # Initialize meta if new
+                    self._init_meta(txn)
+            else:
+                # Handles opened inside a read txn die with it, so let lmdb
+                # open them without an explicit transaction
+                self._dbs[DB_META] = self._env.open_db(DB_META, create=False)
+                with self.read_txn() as txn:
+                    self._check_versions(txn)
+                for db_name in ALL_DBS:
+                    dupsort = db_name in DUPSORT_DBS
+                    self._dbs[db_name] = self._env.open_db(
+                        db_name, create=False, dupsort=dupsort, dupfixed=dupsort, integerdup=dupsort
+                    )
+        except Exception:
+            self._env.close()
+            raise
+    
+    def _check_versions(self, txn):
+        """Refuse a database stored under another schema or canonicalization.
+        
+        Raises:
+            ValueError: If a stored version differs from this code's.
+        """
+        meta_db = self._dbs[DB_META]
+        for key, expected in (
+            (b"schema_version", SCHEMA_VERSION),
+            (b"canonicalization_version", CANONICALIZATION_VERSION),
+        ):
+            data = txn.get(key, db=meta_db)
+            if data is not None and _U32.unpack(data)[0] != expected:
+                raise ValueError(
+                    f"Database {self.path} has {key.decode()} {_U32.unpack(data)[0]}, "
+                    f"this code expects {expected}; rebuild the database"
+                )
     
     def _init_meta(self, txn):
         """Initialize meta database if empty."""
@@ -109,14 +179,17 @@ class TemplateDBEnv:
         version = txn.get(b"schema_version", db=meta_db)
         if version is None:
             # First time initialization
-            txn.put(b"schema_version", struct.pack("<I", SCHEMA_VERSION), db=meta_db)
-            txn.put(b"canonicalization_version", struct.pack("<I", CANONICALIZATION_VERSION), db=meta_db)
+            txn.put(b"schema_version", _U32.pack(SCHEMA_VERSION), db=meta_db)
+            txn.put(b"canonicalization_version", _U32.pack(CANONICALIZATION_VERSION), db=meta_db)
             txn.put(b"basis", b"eca57", db=meta_db)
-            txn.put(b"template_count", struct.pack("<Q", 0), db=meta_db)
-            txn.put(b"witness_count", struct.pack("<Q", 0), db=meta_db)
+            txn.put(b"template_count", _U64.pack(0), db=meta_db)
+            txn.put(b"witness_count", _U64.pack(0), db=meta_db)
     
     def close(self):
-        """Close the environment."""
+        """Close the environment (flushing it to disk first in bulk_load mode)."""
+        self.invalidate_read_txns()
+        if self.config.bulk_load and not self.config.readonly:
+            self._env.sync(True)
         self._env.close()
     
     def __enter__(self):
@@ -133,9 +206,49 @@ class TemplateDBEnv:
     
     @contextmanager
     def write_txn(self):
-        """Context manager for write transaction."""
-        with self._env.begin(write=True) as txn:
-            yield txn
+        """Context manager for write transaction.
+        
+        The calling thread's cached read txn is aborted up front so its
+        snapshot does not keep freed pages from being reused.
+        """
+        self._drop_cached_read_txn()
+        try:
+            with self._env.begin(write=True) as txn:
+                yield txn
+        finally:
+            self._generation += 1
+    
+    def cached_read_txn(self):
+        """Return this thread's long-lived read transaction.
+        
+        Reused across point lookups, which saves a begin/abort each. It is
+        replaced after any write_txn on this env; writes made by other
+        processes become visible after invalidate_read_txns().
+        """
+        local = self._local
+        txn = getattr(local, "txn", None)
+        if txn is None or local.generation != self._generation:
+            if txn is not None:
+                txn.abort()
+            txn = local.txn = self._env.begin(write=False)
+            local.generation = self._generation
+        return txn
+    
+    def invalidate_read_txns(self):
+        """Abort this thread's cached read txn and mark the others stale.
+        
+        Other threads keep their current snapshot pinned until their next
+        cached_read_txn() call, which then begins a new one.
+        """
+        self._generation += 1
+        self._drop_cached_read_txn()
+    
+    def _drop_cached_read_txn(self):
+        """Abort the calling thread's cached read txn, if any."""
+        txn = getattr(self._local, "txn", None)
+        if txn is not None:
+            txn.abort()
+            self._local.txn = None
     
     # -------------------------------------------------------------------------
     # Meta operations
@@ -158,30 +271,33 @@ class TemplateDBEnv:
     def get_schema_version(self, txn) -> int:
         """Get schema version."""
         data = txn.get(b"schema_version", db=self._dbs[DB_META])
-        return struct.unpack("<I", data)[0] if data else 0
+        return _U32.unpack(data)[0] if data else 0
     
     def get_template_count(self, txn) -> int:
         """Get total template count."""
         data = txn.get(b"template_count", db=self._dbs[DB_META])
-        return struct.unpack("<Q", data)[0] if data else 0
+        return _U64.unpack(data)[0] if data else 0
     
-    def increment_template_count(self, txn) -> int:
-        """Increment and return new template count."""
+    def increment_template_count(self, txn, n: int = 1) -> int:
+        """Increment template count by n and return the new count.
+        
+        The IDs current+1 .. current+n are reserved for the caller.
+        """
         current = self.get_template_count(txn)
-        new_count = current + 1
-        txn.put(b"template_count", struct.pack("<Q", new_count), db=self._dbs[DB_META])
+        new_count = current + n
+        txn.put(b"template_count", _U64.pack(new_count), db=self._dbs[DB_META])
         return new_count
     
     def get_witness_count(self, txn) -> int:
         """Get total witness count."""
         data = txn.get(b"witness_count", db=self._dbs[DB_META])
-        return struct.unpack("<Q", data)[0] if data else 0
+        return _U64.unpack(data)[0] if data else 0
     
     def increment_witness_count(self, txn) -> int:
         """Increment and return new witness count."""
         current = self.get_witness_count(txn)
         new_count = current + 1
-        txn.put(b"witness_count", struct.pack("<Q", new_count), db=self._dbs[DB_META])
+        txn.put(b"witness_count", _U64.pack(new_count), db=self._dbs[DB_META])
         return new_count
     
     # -------------------------------------------------------------------------
@@ -191,15 +307,23 @@ class TemplateDBEnv:
     def make_template_key(self, basis_id: int, width: int, gate_count: int, canonical_hash: bytes) -> bytes:
         """Create key for templates_by_hash lookup.
         
-        Key format: basis_id (1) + width (1) + gate_count (2) + hash (32) = 36 bytes
+        Key format: basis_id (1) + width (1) + gate_count (2) + hash (16) = 20 bytes
         """
-        return struct.pack("<BBH", basis_id, width, gate_count) + canonical_hash
+        return _HASH_KEY.pack(basis_id, width, gate_count, canonical_hash)
     
     def get_template(self, txn, basis_id: int, width: int, gate_count: int, canonical_hash: bytes) -> Optional[bytes]:
         """Get template by canonical hash."""
         key = self.make_template_key(basis_id, width, gate_count, canonical_hash)
         return txn.get(key, db=self._dbs[DB_TEMPLATES_BY_HASH])
     
+    def get_template_by_key(self, txn, key: bytes) -> Optional[bytes]:
+        """Get template by a key from make_template_key."""
+        return txn.get(key, db=self._dbs[DB_TEMPLATES_BY_HASH])
+    
+    def put_template_by_key(self, txn, key: bytes, record: bytes):
+        """Put template record under a key from make_template_key (overwrites)."""
+        txn.put(key, record, db=self._dbs[DB_TEMPLATES_BY_HASH])
+    
     def put_template(self, txn, basis_id: int, width: int, gate_count: int, 
                      canonical_hash: bytes, record: bytes) -> bool:
         """Put template record.
@@ -225,12 +349,80 @@ class TemplateDBEnv:
         txn.put(key, record, db=db)
         return True
     
+    def iter_template_values_by_dims(self, txn, basis_id: int, width: int,
+                                     gate_count: int) -> Iterator[bytes]:
+        """Iterate template records of one (width, gate_count) in a single range scan.
+        
+        templates_by_hash keys start with the (basis_id, width, gate_count)
+        prefix, so this reads the records directly, in canonical hash order,
+        without going through the dims index.
+        
+        Yields:
+            Serialized TemplateRecord bytes.
+        """
+        prefix = _KEY_PREFIX.pack(basis_id, width, gate_count)
+        cursor = txn.cursor(db=self._dbs[DB_TEMPLATES_BY_HASH])
+        
+        if cursor.set_range(prefix):
+            for key, value in cursor:
+                if not key.startswith(prefix):
+                    break
+                yield value
+    
+    def put_templates_bulk(self, txn, records: list[tuple[int, int, int, bytes, bytes]]) -> int:
+        """Put many template records at once (existing keys are kept).
+        
+        Callers should dedupe records first; for repeated keys the one
+        passed first is stored.
+        
+        Args:
+            txn: LMDB write transaction.
+            records: (basis_id, width, gate_count, canonical_hash, record) tuples.
+            
+        Returns:
+            Number of records actually inserted.
+        """
+        items = [
+            (self.make_template_key(b, w, gc, h), record) for b, w, gc, h, record in records
+        ]
+        return self._put_sorted(txn, DB_TEMPLATES_BY_HASH, items)
+    
+    def put_template_items_bulk(self, txn, items: list[tuple[bytes, bytes]]) -> int:
+        """put_templates_bulk for (make_template_key key, record) pairs."""
+        return self._put_sorted(txn, DB_TEMPLATES_BY_HASH, items)
+    
+    def _put_sorted(self, txn, db_name: bytes, items: list[tuple[bytes, bytes]],
+                    dupdata: bool = False) -> int:
+        """Write items in key order with a single putmulti call.
+        
+        When every key sorts after the current last key (e.g. a fresh
+        database or monotonic IDs), LMDB's append mode skips the B-tree
+        search per item. With dupdata the values must be _ID-packed.
+        
+        Returns:
+            Number of items added.
+        """
+        if not items:
+            return 0
+        if dupdata:
+            # Duplicates are integer IDs, ordered numerically by LMDB
+            items.sort(key=lambda item: (item[0], _ID.unpack(item[1])[0]))
+        else:
+            # Stable and by key only, so the first of repeated keys is kept
+            items.sort(key=itemgetter(0))
+        cursor = txn.cursor(db=self._dbs[db_name])
+        append = not cursor.last() or items[0][0] > cursor.key()
+        _, added = cursor.putmulti(
+            items, dupdata=dupdata, overwrite=dupdata, append=append
+        )
+        return added
+    
     def make_dims_key(self, basis_id: int, width: int, gate_count: int, template_id: int) -> bytes:
         """Create key for templates_by_dims enumeration.
         
         Key format: basis_id (1) + width (1) + gate_count (2) + template_id (8) = 12 bytes
         """
-        return struct.pack("<BBHQ", basis_id, width, gate_count, template_id)
+        return _DIMS_KEY.pack(basis_id, width, gate_count, template_id)
     
     def put_template_dims_index(self, txn, basis_id: int, width: int, gate_count: int,
                                  template_id: int, canonical_hash: bytes):
@@ -238,6 +430,16 @@ class TemplateDBEnv:
         key = self.make_dims_key(basis_id, width, gate_count, template_id)
         txn.put(key, canonical_hash, db=self._dbs[DB_TEMPLATES_BY_DIMS])
     
+    def put_template_dims_bulk(self, txn, entries: list[tuple[int, int, int, int, bytes]]):
+        """Add many templates to the dims index.
+        
+        Args:
+            txn: LMDB write transaction.
+            entries: (basis_id, width, gate_count, template_id, canonical_hash) tuples.
+        """
+        items = [(self.make_dims_key(b, w, gc, tid), h) for b, w, gc, tid, h in entries]
+        self._put_sorted(txn, DB_TEMPLATES_BY_DIMS, items)
+    
     def iter_templates_by_dims(self, txn, basis_id: int, width: int, gate_count: int) -> Iterator[tuple[int, bytes]]:
         """Iterate templates by dimension (width, gate_count).
         
@@ -250,7 +452,7 @@ class TemplateDBEnv:
         Yields:
             (template_id, canonical_hash) tuples
         """
-        prefix = struct.pack("<BBH", basis_id, width, gate_count)
+        prefix = _KEY_PREFIX.pack(basis_id, width, gate_count)
         cursor = txn.cursor(db=self._dbs[DB_TEMPLATES_BY_DIMS])
         
         if cursor.set_range(prefix):
@@ -258,7 +460,7 @@ class TemplateDBEnv:
                 if not key.startswith(prefix):
                     break
                 # Extract template_id from key
-                template_id = struct.unpack("<Q", key[4:12])[0]
+                template_id = _U64.unpack_from(key, 4)[0]
                 yield (template_id, value)
     
     # -------------------------------------------------------------------------
@@ -267,34 +469,29 @@ class TemplateDBEnv:
     
     def make_family_key(self, basis_id: int, family_hash: bytes) -> bytes:
         """Create key for template_families lookup."""
-        return struct.pack("<B", basis_id) + family_hash
+        return bytes((basis_id,)) + family_hash
     
     def add_to_family(self, txn, basis_id: int, family_hash: bytes, template_id: int):
-        """Add template_id to a family."""
+        """Add template_id to a family (stored as a sorted duplicate)."""
         key = self.make_family_key(basis_id, family_hash)
-        db = self._dbs[DB_TEMPLATE_FAMILIES]
-        
-        # Get existing list
-        existing = txn.get(key, db=db)
-        if existing:
-            # Append new ID
-            new_value = existing + struct.pack("<Q", template_id)
-        else:
-            new_value = struct.pack("<Q", template_id)
-        
-        txn.put(key, new_value, db=db)
+        txn.put(key, _ID.pack(template_id), db=self._dbs[DB_TEMPLATE_FAMILIES], dupdata=True)
+    
+    def add_many_to_families(self, txn, basis_id: int, members: list[tuple[bytes, int]]):
+        """Add many (family_hash, template_id) memberships in one putmulti call."""
+        items = [(self.make_family_key(basis_id, f), _ID.pack(tid)) for f, tid in members]
+        self._put_sorted(txn, DB_TEMPLATE_FAMILIES, items, dupdata=True)
     
     def get_family_members(self, txn, basis_id: int, family_hash: bytes) -> list[int]:
         """Get all template_ids in a family."""
         key = self.make_family_key(basis_id, family_hash)
-        data = txn.get(key, db=self._dbs[DB_TEMPLATE_FAMILIES])
-        
-        if not data:
+        return self._get_ids(txn, DB_TEMPLATE_FAMILIES, key)
+    
+    def _get_ids(self, txn, db_name: bytes, key: bytes) -> list[int]:
+        """Read all duplicate IDs stored under key, in ascending order."""
+        cursor = txn.cursor(db=self._dbs[db_name])
+        if not cursor.set_key(key):
             return []
-        
-        # Unpack list of u64
-        count = len(data) // 8
-        return list(struct.unpack(f"<{count}Q", data))
+        return [_ID.unpack(v)[0] for v in cursor.iternext_dup()]
     
     # -------------------------------------------------------------------------
     #  Witness operations
@@ -303,9 +500,9 @@ class TemplateDBEnv:
     def make_witness_key(self, basis_id: int, width: int, witness_len: int, witness_hash: bytes) -> bytes:
         """Create key for witnesses_by_hash lookup.
         
-        Key format: basis_id (1) + width (1) + witness_len (2) + hash (32) = 36 bytes
+        Key format: basis_id (1) + width (1) + witness_len (2) + hash (16) = 20 bytes
         """
-        return struct.pack("<BBH", basis_id, width, witness_len) + witness_hash
+        return _HASH_KEY.pack(basis_id, width, witness_len, witness_hash)
     
     def get_witness(self, txn, basis_id: int, width: int, witness_len: int, witness_hash: bytes) -> Optional[bytes]:
         """Get witness by hash."""
@@ -316,49 +513,84 @@ class TemplateDBEnv:
                     witness_hash: bytes, record: bytes) -> bool:
         """Put witness record. Returns False if already exists."""
         key = self.make_witness_key(basis_id, width, witness_len, witness_hash)
-        db = self._dbs[DB_WITNESSES_BY_HASH]
-        
-        if txn.get(key, db=db) is not None:
-            return False
+        # One B-tree descent both checks for and inserts the key
+        return txn.put(key, record, db=self._dbs[DB_WITNESSES_BY_HASH], overwrite=False)
+    
+    def put_witnesses_bulk(self, txn, records: list[tuple[int, int, int, bytes, bytes]]) -> int:
+        """Put many witness records at once (existing keys are kept).
         
-        txn.put(key, record, db=db)
-        return True
+        Args:
+            txn: LMDB write transaction.
+            records: (basis_id, width, witness_len, witness_hash, record) tuples.
+            
+        Returns:
+            Number of records actually inserted.
+        """
+        items = [
+            (self.make_witness_key(b, w, n, h), record) for b, w, n, h, record in records
+        ]
+        return self._put_sorted(txn, DB_WITNESSES_BY_HASH, items)
     
     def make_prefilter_key(self, basis_id: int, width: int, token_hash: int) -> bytes:
         """Create key for witness prefilter.
         
         Key format: basis_id (1) + width (1) + token_hash (8) = 10 bytes
         """
-        return struct.pack("<BBQ", basis_id, width, token_hash)
+        return _PREFILTER_KEY.pack(basis_id, width, token_hash)
     
     def add_to_prefilter(self, txn, basis_id: int, width: int, token_hash: int, witness_id: int):
         """Add witness_id to prefilter token bucket."""
         key = self.make_prefilter_key(basis_id, width, token_hash)
-        db = self._dbs[DB_WITNESS_PREFILTER]
-        
-        existing = txn.get(key, db=db)
-        if existing:
-            new_value = existing + struct.pack("<Q", witness_id)
-        else:
-            new_value = struct.pack("<Q", witness_id)
+        txn.put(key, _ID.pack(witness_id), db=self._dbs[DB_WITNESS_PREFILTER], dupdata=True)
+    
+    def add_many_to_prefilter(self, txn, basis_id: int, width: int,
+                              token_hashes: Iterable[int], witness_id: int):
+        """Add witness_id to several prefilter token buckets in one putmulti call.
         
-        txn.put(key, new_value, db=db)
+        Keys are deduplicated and put in key order, so repeated tokens cost
+        nothing and each descent starts near the previous one's pages.
+        """
+        value = _ID.pack(witness_id)
+        keys = sorted({self.make_prefilter_key(basis_id, width, t) for t in token_hashes})
+        items = [(key, value) for key in keys]
+        txn.cursor(db=self._dbs[DB_WITNESS_PREFILTER]).putmulti(items, dupdata=True)
     
     def lookup_prefilter(self, txn, basis_id: int, width: int, token_hash: int) -> list[int]:
         """Lookup witness_ids by prefilter token."""
         key = self.make_prefilter_key(basis_id, width, token_hash)
-        data = txn.get(key, db=self._dbs[DB_WITNESS_PREFILTER])
-        
-        if not data:
-            return []
-        
-        count = len(data) // 8
-        return list(struct.unpack(f"<{count}Q", data))
+        return self._get_ids(txn, DB_WITNESS_PREFILTER, key)
     
     # -------------------------------------------------------------------------
     # Stats
     # -------------------------------------------------------------------------
     
+    def prefetch(self) -> bool:
+        """Ask the kernel to read the whole data file into the page cache.
+        
+        Cursor scans over a cold database otherwise stall on one page fault
+        at a time. The hint covers the entire data.mdb, not just the ranges
+        a caller scans, so it is skipped when the file is larger than the
+        currently available memory (it would only evict useful cache).
+        
+        Returns:
+            True if the hint was issued.
+        """
+        if not hasattr(os, "posix_fadvise"):
+            return False
+        data_path = self.path / "data.mdb"
+        try:
+            available = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (ValueError, OSError):
+            return False
+        if data_path.stat().st_size > available:
+            return False
+        fd = os.open(data_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+        return True
+    
     def stats(self) -> dict:
         """Get database statistics."""
         with self.read_txn() as txn:
@@ -6,7 +6,28 @@ Schema Overview:
 """
 from __future__ import annotations
 
-SCHEMA_SQL = """
+# Connection setup, run before SCHEMA_SQL. page_size only takes effect on a
+# new file, so it must come before WAL; journal_mode cannot change inside
+# a transaction, so these stay outside the schema batch.
+PRAGMA_SQL = """
+PRAGMA page_size=8192;
+-- Write-throughput tuning: WAL journal, fsync only at checkpoints
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+-- Read tuning: 128 MB page cache, reads served from a 1 GB memory map
+PRAGMA cache_size=-131072;
+PRAGMA mmap_size=1073741824;
+"""
+
+# Stored in PRAGMA user_version. 2: canonical_repr and gate_list are packed
+# BLOBs (pack_gates) instead of TEXT/JSON; older files must be rebuilt
+SCHEMA_VERSION = 2
+
+# All DDL runs as one transaction (one journal sync instead of one per statement)
+SCHEMA_SQL = f"""
+BEGIN;
+
 -- Equivalence classes group circuits that are equivalent under unroll operations
 -- (swaps, rotations, reversals, wire permutations)
 CREATE TABLE IF NOT EXISTS equivalence_classes (
@@ -23,8 +44,8 @@ CREATE TABLE IF NOT EXISTS equivalence_classes (
 CREATE TABLE IF NOT EXISTS circuits (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     equivalence_class_id INTEGER REFERENCES equivalence_classes(id),
-    canonical_repr TEXT UNIQUE NOT NULL,  -- JSON representation of gates
-    gate_list TEXT NOT NULL,              -- Original gate list as JSON
+    canonical_repr BLOB UNIQUE NOT NULL,  -- Packed canonical gates (pack_gates)
+    gate_list BLOB NOT NULL,              -- Original gate list (pack_gates)
     width INTEGER NOT NULL,
     gate_count INTEGER NOT NULL,
     is_representative BOOLEAN DEFAULT FALSE,
@@ -34,9 +55,22 @@ CREATE TABLE IF NOT EXISTS circuits (
 
 -- Indexes for common queries
 CREATE INDEX IF NOT EXISTS idx_equiv_width_gc ON equivalence_classes(width, gate_count);
-CREATE INDEX IF NOT EXISTS idx_equiv_hash ON equivalence_classes(invariant_hash);
+CREATE INDEX IF NOT EXISTS idx_equiv_hash_width_gc
+    ON equivalence_classes(invariant_hash, width, gate_count);
 CREATE INDEX IF NOT EXISTS idx_circuits_equiv ON circuits(equivalence_class_id);
 CREATE INDEX IF NOT EXISTS idx_circuits_width_gc ON circuits(width, gate_count);
+CREATE INDEX IF NOT EXISTS idx_circuits_gate_list ON circuits(gate_list, width);
+-- Partial indexes only hold rows matching their WHERE clause: one entry per
+-- class for representatives, none at all until truth tables are filled in
+DROP INDEX IF EXISTS idx_circuits_rep_width_gc;
+CREATE INDEX IF NOT EXISTS idx_circuits_rep
+    ON circuits(width, gate_count) WHERE is_representative = TRUE;
+CREATE INDEX IF NOT EXISTS idx_circuits_tth
+    ON circuits(truth_table_hash) WHERE truth_table_hash IS NOT NULL;
+
+PRAGMA user_version = {SCHEMA_VERSION};
+
+COMMIT;
 """
 
 FOREIGN_KEY_UPDATE = """
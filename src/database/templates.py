@@ -5,12 +5,25 @@ Provides TemplateRecord serialization and high-level template operations.
 from __future__ import annotations
 
 import struct
+from contextlib import contextmanager
+from itertools import chain
 from dataclasses import dataclass, field
 from enum import IntEnum
-from typing import Optional, Iterator, Any
+from typing import Optional, Iterable, Iterator, Any
 
 from database.lmdb_env import TemplateDBEnv
-from database.basis import GateBasis, ECA57Basis, BASIS_ECA57
+from database.basis import GateBasis, ECA57Basis, BASIS_ECA57, HASH_SIZE
+
+
+# Max records written per transaction by bulk inserts
+_TXN_BATCH = 4096
+
+# Fixed record header (59 bytes), see TemplateRecord.to_bytes
+_HDR = struct.Struct(f"<QBBH{HASH_SIZE}s{HASH_SIZE}sBQIH")
+_HDR_SIZE = _HDR.size
+
+# One packed ECA57 gate: target, ctrl1, ctrl2
+_GATE3 = struct.Struct("3B")
 
 
 class OriginKind(IntEnum):
@@ -28,8 +41,8 @@ class TemplateRecord:
         basis_id: Gate basis (1=ECA57, 2=MCT, etc.)
         width: Number of wires
         gate_count: Number of gates
-        canonical_hash: 32-byte canonical hash
-        family_hash: 32-byte family hash (groups variants)
+        canonical_hash: 16-byte canonical hash
+        family_hash: 16-byte family hash (groups variants)
         origin: How this template was generated
         origin_template_id: If unrolled, the source template ID
         unroll_ops: Bitfield of unroll operations applied
@@ -44,7 +57,7 @@ class TemplateRecord:
     origin: OriginKind
     origin_template_id: Optional[int] = None
     unroll_ops: int = 0
-    gates_encoded: bytes = b""
+    gates_encoded: bytes | memoryview = b""
     
     def to_bytes(self) -> bytes:
         """Serialize to bytes for storage.
@@ -54,18 +67,15 @@ class TemplateRecord:
             basis_id: u8
             width: u8
             gate_count: u16
-            canonical_hash: 32 bytes
-            family_hash: 32 bytes
+            canonical_hash: 16 bytes
+            family_hash: 16 bytes
             origin: u8
             origin_template_id: u64 (0 if None)
             unroll_ops: u32
             gates_len: u16
             gates_encoded: variable
         """
-        origin_tid = self.origin_template_id or 0
-        
-        header = struct.pack(
-            "<QBBH32s32sBQIH",
+        return _HDR.pack(
             self.template_id,
             self.basis_id,
             self.width,
@@ -73,25 +83,28 @@ class TemplateRecord:
             self.canonical_hash,
             self.family_hash,
             self.origin.value,
-            origin_tid,
+            self.origin_template_id or 0,
             self.unroll_ops,
             len(self.gates_encoded),
-        )
-        return header + self.gates_encoded
+        ) + self.gates_encoded
+    
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview) -> "TemplateRecord":
+        """Deserialize from bytes (the record owns a copy of its gates)."""
+        record = cls.view_from_bytes(data)
+        record.gates_encoded = bytes(record.gates_encoded)
+        return record
     
     @classmethod
-    def from_bytes(cls, data: bytes) -> "TemplateRecord":
-        """Deserialize from bytes."""
-        # Header is 84 bytes fixed
-        header_size = 8 + 1 + 1 + 2 + 32 + 32 + 1 + 8 + 4 + 2  # = 91 bytes
+    def view_from_bytes(cls, data: bytes | memoryview) -> "TemplateRecord":
+        """Deserialize without copying the gates.
         
+        gates_encoded is a memoryview into data, so data must stay valid
+        (e.g. not an LMDB buffer of a finished transaction) while it is used.
+        """
         (template_id, basis_id, width, gate_count,
          canonical_hash, family_hash, origin_val,
-         origin_tid, unroll_ops, gates_len) = struct.unpack(
-            "<QBBH32s32sBQIH", data[:header_size]
-        )
-        
-        gates_encoded = data[header_size:header_size + gates_len]
+         origin_tid, unroll_ops, gates_len) = _HDR.unpack_from(data, 0)
         
         return cls(
             template_id=template_id,
@@ -103,7 +116,7 @@ class TemplateRecord:
             origin=OriginKind(origin_val),
             origin_template_id=origin_tid if origin_tid != 0 else None,
             unroll_ops=unroll_ops,
-            gates_encoded=gates_encoded,
+            gates_encoded=memoryview(data)[_HDR_SIZE:_HDR_SIZE + gates_len],
         )
 
 
@@ -124,16 +137,26 @@ def encode_gates_eca57(gates: list) -> bytes:
     return bytes(result)
 
 
-def decode_gates_eca57(data: bytes) -> list[tuple[int, int, int]]:
+def encode_gates_eca57_tuples(gates: list[tuple[int, int, int]]) -> bytes:
+    """Fast path of encode_gates_eca57 for exact (target, ctrl1, ctrl2) tuples.
+    
+    The bytes are built in one C-level pass over the flattened tuples
+    (e.g. ECA57Basis.canonicalize output).
+    """
+    return bytes(chain.from_iterable(gates))
+
+
+def decode_gates_eca57(data: bytes | memoryview) -> list[tuple[int, int, int]]:
     """Decode packed ECA57 gates.
     
     Returns list of (target, ctrl1, ctrl2) tuples.
     """
-    gates = []
-    for i in range(0, len(data), 3):
-        t, c1, c2 = data[i], data[i+1], data[i+2]
-        gates.append((t, c1, c2))
-    return gates
+    return list(_GATE3.iter_unpack(data))
+
+
+def iter_gates_eca57(data: bytes | memoryview) -> Iterator[tuple[int, int, int]]:
+    """Lazily decode packed ECA57 gates, without building a list."""
+    return _GATE3.iter_unpack(data)
 
 
 class TemplateStore:
@@ -179,13 +202,84 @@ class TemplateStore:
         Returns:
             TemplateRecord if inserted, None if duplicate.
         """
-        # Canonicalize
+        with self.batch_insert() as txn:
+            return self.insert_template_in_txn(
+                txn, gates, width, origin, origin_template_id, unroll_ops, family_hash
+            )
+    
+    @contextmanager
+    def batch_insert(self):
+        """Write transaction shared by several insert_template_in_txn calls.
+        
+        Commits once on exit (aborts if the block raises).
+        """
+        with self.env.write_txn() as txn:
+            yield txn
+    
+    def insert_template_in_txn(
+        self,
+        txn,
+        gates: list,
+        width: int,
+        origin: OriginKind = OriginKind.SAT,
+        origin_template_id: Optional[int] = None,
+        unroll_ops: int = 0,
+        family_hash: Optional[bytes] = None,
+    ) -> Optional[TemplateRecord]:
+        """insert_template inside an existing write transaction (see batch_insert)."""
         canonical_gates, canonical_hash = self.basis.canonicalize(gates, width)
-        gate_count = len(gates)
+        return self.insert_template_canonical_in_txn(
+            txn, canonical_gates, canonical_hash, width,
+            origin, origin_template_id, unroll_ops, family_hash,
+        )
+    
+    def insert_template_canonical(
+        self,
+        canonical_gates: list,
+        canonical_hash: bytes,
+        width: int,
+        origin: OriginKind = OriginKind.SAT,
+        origin_template_id: Optional[int] = None,
+        unroll_ops: int = 0,
+        family_hash: Optional[bytes] = None,
+    ) -> Optional[TemplateRecord]:
+        """insert_template for a caller that already has basis.canonicalize's output.
+        
+        Args:
+            canonical_gates: Canonical gate list.
+            canonical_hash: Canonical hash of the gates.
+            width: Number of wires.
+            origin: How this template was generated.
+            origin_template_id: If unrolled, source template ID.
+            unroll_ops: Bitfield of unroll operations.
+            family_hash: Optional family hash (defaults to canonical hash).
+            
+        Returns:
+            TemplateRecord if inserted, None if duplicate.
+        """
+        with self.batch_insert() as txn:
+            return self.insert_template_canonical_in_txn(
+                txn, canonical_gates, canonical_hash, width,
+                origin, origin_template_id, unroll_ops, family_hash,
+            )
+    
+    def insert_template_canonical_in_txn(
+        self,
+        txn,
+        canonical_gates: list,
+        canonical_hash: bytes,
+        width: int,
+        origin: OriginKind = OriginKind.SAT,
+        origin_template_id: Optional[int] = None,
+        unroll_ops: int = 0,
+        family_hash: Optional[bytes] = None,
+    ) -> Optional[TemplateRecord]:
+        """insert_template_canonical inside an existing write transaction."""
+        gate_count = len(canonical_gates)
         
         # Encode gates
         if self.basis.basis_id == BASIS_ECA57:
-            gates_encoded = encode_gates_eca57(canonical_gates)
+            gates_encoded = encode_gates_eca57_tuples(canonical_gates)
         else:
             raise NotImplementedError(f"Gate encoding for basis {self.basis.basis_id}")
         
@@ -193,48 +287,162 @@ class TemplateStore:
         if family_hash is None:
             family_hash = canonical_hash
         
-        with self.env.write_txn() as txn:
-            # Check for duplicate
-            existing = self.env.get_template(
-                txn, self.basis.basis_id, width, gate_count, canonical_hash
-            )
-            if existing is not None:
-                return None  # Duplicate
+        # Check for duplicate; the key is packed once for the lookup and the put
+        key = self.env.make_template_key(self.basis.basis_id, width, gate_count, canonical_hash)
+        if self.env.get_template_by_key(txn, key) is not None:
+            return None  # Duplicate
+        
+        # Get new template ID
+        template_id = self.env.increment_template_count(txn)
+        
+        # Create record
+        record = TemplateRecord(
+            template_id=template_id,
+            basis_id=self.basis.basis_id,
+            width=width,
+            gate_count=gate_count,
+            canonical_hash=canonical_hash,
+            family_hash=family_hash,
+            origin=origin,
+            origin_template_id=origin_template_id,
+            unroll_ops=unroll_ops,
+            gates_encoded=gates_encoded,
+        )
+        
+        # Store in templates_by_hash
+        self.env.put_template_by_key(txn, key, record.to_bytes())
+        
+        # Add to dims index
+        self.env.put_template_dims_index(
+            txn, self.basis.basis_id, width, gate_count,
+            template_id, canonical_hash
+        )
+        
+        # Add to family
+        self.env.add_to_family(txn, self.basis.basis_id, family_hash, template_id)
+        
+        return record
+    
+    def insert_templates(
+        self,
+        variants: Iterable[tuple[list, int]],
+        width: int,
+        origin: OriginKind = OriginKind.SAT,
+        origin_template_id: Optional[int] = None,
+        family_hash: Optional[bytes] = None,
+    ) -> list[TemplateRecord]:
+        """Insert many templates in one transaction with bulk LMDB writes.
+        
+        Same result as calling insert_template for each variant in order,
+        but canonicalization and in-batch deduplication happen up front
+        (see bulk_insert_prehashed).
+        
+        Args:
+            variants: (gates, unroll_ops) pairs.
+            width: Number of wires.
+            origin: How these templates were generated.
+            origin_template_id: If unrolled, source template ID.
+            family_hash: Optional family hash (defaults to each canonical hash).
             
-            # Get new template ID
-            template_id = self.env.increment_template_count(txn)
+        Returns:
+            Records actually inserted (duplicates are skipped).
+        """
+        # Canonicalize and dedupe within the batch (first occurrence wins)
+        pending = {}
+        for gates, unroll_ops in variants:
+            canonical_gates, canonical_hash = self.basis.canonicalize(gates, width)
+            if canonical_hash not in pending:
+                pending[canonical_hash] = (canonical_gates, canonical_hash, unroll_ops)
+        
+        return self.bulk_insert_prehashed(
+            list(pending.values()), width, origin, origin_template_id, family_hash
+        )
+    
+    def bulk_insert_prehashed(
+        self,
+        entries: list[tuple[list, bytes, int]],
+        width: int,
+        origin: OriginKind = OriginKind.SAT,
+        origin_template_id: Optional[int] = None,
+        family_hash: Optional[bytes] = None,
+    ) -> list[TemplateRecord]:
+        """Insert already canonicalized, mutually distinct templates.
+        
+        Probes each hash for an existing template and writes the records,
+        dims index and family members as sorted putmulti batches, in one
+        write transaction per 4096 entries (bounding transaction size).
+        
+        Args:
+            entries: (canonical_gates, canonical_hash, unroll_ops) tuples
+                as produced by basis.canonicalize, with distinct hashes.
+            width: Number of wires.
+            origin: How these templates were generated.
+            origin_template_id: If unrolled, source template ID.
+            family_hash: Optional family hash (defaults to each canonical hash).
             
-            # Create record
-            record = TemplateRecord(
+        Returns:
+            Records actually inserted (already stored templates are skipped).
+        """
+        if self.basis.basis_id != BASIS_ECA57:
+            raise NotImplementedError(f"Gate encoding for basis {self.basis.basis_id}")
+        
+        records = []
+        for start in range(0, len(entries), _TXN_BATCH):
+            with self.batch_insert() as txn:
+                records.extend(self._bulk_insert_in_txn(
+                    txn, entries[start:start + _TXN_BATCH],
+                    width, origin, origin_template_id, family_hash,
+                ))
+        return records
+    
+    def _bulk_insert_in_txn(
+        self,
+        txn,
+        entries: list[tuple[list, bytes, int]],
+        width: int,
+        origin: OriginKind,
+        origin_template_id: Optional[int],
+        family_hash: Optional[bytes],
+    ) -> list[TemplateRecord]:
+        """One transaction's worth of bulk_insert_prehashed."""
+        basis_id = self.basis.basis_id
+        make_key = self.env.make_template_key
+        fresh = []
+        for entry in entries:
+            key = make_key(basis_id, width, len(entry[0]), entry[1])
+            if self.env.get_template_by_key(txn, key) is None:
+                fresh.append((key, entry))
+        if not fresh:
+            return []
+        
+        records = []
+        first_id = self.env.increment_template_count(txn, len(fresh)) - len(fresh) + 1
+        for template_id, (_, (canonical_gates, canonical_hash, unroll_ops)) in (
+            enumerate(fresh, start=first_id)
+        ):
+            records.append(TemplateRecord(
                 template_id=template_id,
-                basis_id=self.basis.basis_id,
+                basis_id=basis_id,
                 width=width,
-                gate_count=gate_count,
+                gate_count=len(canonical_gates),
                 canonical_hash=canonical_hash,
-                family_hash=family_hash,
+                family_hash=family_hash if family_hash is not None else canonical_hash,
                 origin=origin,
                 origin_template_id=origin_template_id,
                 unroll_ops=unroll_ops,
-                gates_encoded=gates_encoded,
-            )
-            
-            # Store in templates_by_hash
-            record_bytes = record.to_bytes()
-            self.env.put_template(
-                txn, self.basis.basis_id, width, gate_count, 
-                canonical_hash, record_bytes
-            )
-            
-            # Add to dims index
-            self.env.put_template_dims_index(
-                txn, self.basis.basis_id, width, gate_count,
-                template_id, canonical_hash
-            )
-            
-            # Add to family
-            self.env.add_to_family(txn, self.basis.basis_id, family_hash, template_id)
-            
-            return record
+                gates_encoded=encode_gates_eca57_tuples(canonical_gates),
+            ))
+        
+        self.env.put_template_items_bulk(txn, [
+            (key, r.to_bytes()) for (key, _), r in zip(fresh, records)
+        ])
+        self.env.put_template_dims_bulk(txn, [
+            (basis_id, width, r.gate_count, r.template_id, r.canonical_hash) for r in records
+        ])
+        self.env.add_many_to_families(
+            txn, basis_id, [(r.family_hash, r.template_id) for r in records]
+        )
+        return records
     
     def get_by_hash(
         self, width: int, gate_count: int, canonical_hash: bytes
@@ -249,16 +457,12 @@ class TemplateStore:
             return TemplateRecord.from_bytes(data)
     
     def iter_by_dims(self, width: int, gate_count: int) -> Iterator[TemplateRecord]:
-        """Iterate all templates for given dimensions."""
+        """Iterate all templates for given dimensions (in canonical hash order)."""
         with self.env.read_txn() as txn:
-            for template_id, canonical_hash in self.env.iter_templates_by_dims(
+            for data in self.env.iter_template_values_by_dims(
                 txn, self.basis.basis_id, width, gate_count
             ):
-                data = self.env.get_template(
-                    txn, self.basis.basis_id, width, gate_count, canonical_hash
-                )
-                if data:
-                    yield TemplateRecord.from_bytes(data)
+                yield TemplateRecord.view_from_bytes(data)
     
     def count_by_dims(self, width: int, gate_count: int) -> int:
         """Count templates for given dimensions."""
@@ -1,7 +1,10 @@
 """Tests for database and equivalence class functionality."""
 from __future__ import annotations
 
+import lmdb
 import pytest
+import sqlite3
+import struct
 import sys
 from pathlib import Path
 
@@ -13,13 +16,29 @@ from database.equivalence import (
     get_invariants,
     invariants_hash,
     circuit_to_tuple,
+    circuit_to_int,
     compute_equivalence_class,
     select_representative,
     canonicalize,
     canonical_repr,
+    pack_gates,
+    unpack_gates,
     are_equivalent,
 )
 from database.db import CircuitDatabase
+from database.templates import (
+    TemplateRecord,
+    OriginKind,
+    encode_gates_eca57,
+    encode_gates_eca57_tuples,
+    decode_gates_eca57,
+    iter_gates_eca57,
+    TemplateStore,
+)
+from database.lmdb_env import TemplateDBEnv, ALL_DBS, SCHEMA_VERSION
+from database.basis import ECA57Basis
+from database.unroll import UnrollConfig, unroll_and_insert, unroll_and_insert_many
+from database.witnesses import WitnessRecord, WitnessStore, compute_kgram_tokens
 
 
 class TestEquivalence:
@@ -69,6 +88,15 @@ class TestEquivalence:
         assert len(equiv_class) >= 1
         assert circ in equiv_class
     
+    def test_compute_equivalence_class_matches_unroll(self):
+        """Test the key-based enumeration yields exactly circuit.unroll()."""
+        circ = Circuit(3).cx(0, 1).x(2).mcx([0, 2], 1)
+        equiv_class = compute_equivalence_class(circ)
+        unrolled = circ.unroll()
+
+        assert len(equiv_class) == len(unrolled)
+        assert all(c in unrolled for c in equiv_class)
+
     def test_select_representative(self):
         """Test representative selection is deterministic."""
         circ = Circuit(2).x(0).x(1)
@@ -79,6 +107,35 @@ class TestEquivalence:
         
         assert rep1 == rep2
     
+    def test_select_representative_is_tuple_minimum(self):
+        """Test representative is the lexicographically smallest gate tuple."""
+        circ = Circuit(3).cx(0, 1).x(2).mcx([0, 2], 1)
+        equiv_class = compute_equivalence_class(circ)
+        
+        rep = select_representative(equiv_class)
+        assert circuit_to_tuple(rep) == min(circuit_to_tuple(c) for c in equiv_class)
+    
+    def test_circuit_to_int_order(self):
+        """Test int packing orders like tuples, incl. control-prefix cases."""
+        circuits = [
+            Circuit(3).x(0).cx(0, 1),
+            Circuit(3).cx(1, 0).x(2),
+            Circuit(3).mcx([1, 2], 0).x(2),
+            Circuit(3).cx(2, 0).x(1),
+        ]
+        by_tuple = sorted(circuits, key=circuit_to_tuple)
+        by_int = sorted(circuits, key=circuit_to_int)
+        assert by_tuple == by_int
+    
+    def test_pack_gates_roundtrip(self):
+        """Test binary gate packing roundtrip and canonical_repr format."""
+        circ = Circuit(4).mcx([0, 3], 1).x(2).cx(1, 0)
+        t = circuit_to_tuple(circ)
+        
+        assert len(pack_gates(t)) == 3 * len(circ)
+        assert unpack_gates(pack_gates(t)) == t
+        assert unpack_gates(canonical_repr(circ)) == circuit_to_tuple(canonicalize(circ))
+    
     def test_canonicalize_deterministic(self):
         """Test that canonicalization is deterministic."""
         circ = Circuit(3).cx(0, 1).x(2)
@@ -88,6 +145,16 @@ class TestEquivalence:
         
         assert canon1 == canon2
     
+    def test_canonicalize_matches_class_minimum(self):
+        """Test direct canonicalization equals the minimum of the unrolled class."""
+        for circ in [
+            Circuit(3).cx(0, 1).x(2).mcx([0, 2], 1),
+            Circuit(3).cx(1, 2).cx(0, 1).cx(1, 2).cx(0, 2),
+            Circuit(4).mcx([1, 3], 0).x(2).cx(0, 3),
+        ]:
+            expected = select_representative(compute_equivalence_class(circ))
+            assert canonicalize(circ) == expected
+    
     def test_equivalent_circuits_same_canonical(self):
         """Test that equivalent circuits have same canonical form."""
         circ1 = Circuit(2).x(0).x(1)
@@ -114,74 +181,316 @@ class TestEquivalence:
         assert not are_equivalent(circ1, circ2)
 
 
+@pytest.fixture(scope="module")
+def shared_db():
+    """One in-memory database per module, so the schema DDL runs once."""
+    with CircuitDatabase(":memory:") as db:
+        yield db
+
+
+@pytest.fixture
+def db(shared_db):
+    """The shared database, emptied after each test.
+    
+    CircuitDatabase commits per insert, which would release a savepoint,
+    so isolation comes from deleting all rows (and AUTOINCREMENT counters).
+    """
+    yield shared_db
+    shared_db.conn.rollback()
+    shared_db.conn.executescript(
+        "DELETE FROM circuits; DELETE FROM equivalence_classes; DELETE FROM sqlite_sequence;"
+    )
+
+
 class TestDatabase:
     """Tests for circuit database."""
     
-    def test_create_database(self):
+    def test_create_database(self, db):
         """Test database creation."""
-        with CircuitDatabase(":memory:") as db:
-            assert db.count_circuits() == 0
+        assert db.count_circuits() == 0
     
-    def test_add_circuit(self):
+    def test_add_circuit(self, db):
         """Test adding a circuit."""
-        with CircuitDatabase(":memory:") as db:
-            circ = Circuit(2).cx(0, 1)
-            circuit_id, equiv_id = db.add_circuit(circ)
-            
-            assert circuit_id is not None
-            assert equiv_id is not None
-            assert db.count_circuits() == 1
+        circ = Circuit(2).cx(0, 1)
+        circuit_id, equiv_id = db.add_circuit(circ)
+        
+        assert circuit_id is not None
+        assert equiv_id is not None
+        assert db.count_circuits() == 1
     
-    def test_add_duplicate_circuit(self):
+    def test_gate_list_roundtrip(self, db):
+        """Test the stored gate list decodes to the original (non-canonical) circuit."""
+        circ = Circuit(3).mcx([0, 2], 1).x(2).cx(1, 0)
+        circuit_id, _ = db.add_circuit(circ)
+        
+        assert db.get_circuit_by_id(circuit_id).gates() == circuit_to_tuple(circ)
+    
+    def test_add_duplicate_circuit(self, db):
         """Test that duplicate circuits return existing IDs."""
-        with CircuitDatabase(":memory:") as db:
-            circ = Circuit(2).cx(0, 1)
-            id1, _ = db.add_circuit(circ)
-            id2, _ = db.add_circuit(circ)
-            
-            assert id1 == id2
-            assert db.count_circuits() == 1
+        circ = Circuit(2).cx(0, 1)
+        id1, _ = db.add_circuit(circ)
+        id2, _ = db.add_circuit(circ)
+        
+        assert id1 == id2
+        assert db.count_circuits() == 1
     
-    def test_add_equivalent_circuits(self):
+    def test_add_equivalent_circuits(self, db):
         """Test adding equivalent circuits."""
-        with CircuitDatabase(":memory:") as db:
-            circ1 = Circuit(2).x(0).x(1)
-            circ2 = circ1.permute([1, 0])
-            
-            _, equiv_id1 = db.add_circuit(circ1)
-            _, equiv_id2 = db.add_circuit(circ2)
-            
-            # Should be in same equivalence class
-            assert equiv_id1 == equiv_id2
+        circ1 = Circuit(2).x(0).x(1)
+        circ2 = circ1.permute([1, 0])
+        
+        _, equiv_id1 = db.add_circuit(circ1)
+        _, equiv_id2 = db.add_circuit(circ2)
+        
+        # Should be in same equivalence class
+        assert equiv_id1 == equiv_id2
     
-    def test_query_by_width_gates(self):
+    def test_query_by_width_gates(self, db):
         """Test querying by width and gate count."""
-        with CircuitDatabase(":memory:") as db:
-            db.add_circuit(Circuit(2).cx(0, 1))
-            db.add_circuit(Circuit(2).x(0).x(1))
-            db.add_circuit(Circuit(3).cx(0, 1))
-            
-            results = db.query_by_width_gates(width=2, gate_count=1)
-            assert len(results) == 1
+        db.add_circuit(Circuit(2).cx(0, 1))
+        db.add_circuit(Circuit(2).x(0).x(1))
+        db.add_circuit(Circuit(3).cx(0, 1))
+        
+        results = db.query_by_width_gates(width=2, gate_count=1)
+        assert len(results) == 1
     
-    def test_get_representative(self):
+    def test_get_representative(self, db):
         """Test getting equivalence class representative."""
-        with CircuitDatabase(":memory:") as db:
-            circ = Circuit(2).cx(0, 1)
-            _, equiv_id = db.add_circuit(circ)
-            
-            rep = db.get_representative(equiv_id)
-            assert rep is not None
-            assert rep["is_representative"] == 1
+        circ = Circuit(2).cx(0, 1)
+        _, equiv_id = db.add_circuit(circ)
+        
+        rep = db.get_representative(equiv_id)
+        assert rep is not None
+        assert rep.is_representative
     
-    def test_count_equivalence_classes(self):
+    def test_count_equivalence_classes(self, db):
         """Test counting equivalence classes."""
-        with CircuitDatabase(":memory:") as db:
-            db.add_circuit(Circuit(2).cx(0, 1))
-            db.add_circuit(Circuit(2).x(0))
+        db.add_circuit(Circuit(2).cx(0, 1))
+        db.add_circuit(Circuit(2).x(0))
+        
+        count = db.count_equivalence_classes(width=2)
+        assert count == 2
+
+    def test_add_circuits_batch(self, db):
+        """Test batch insert dedups and matches single inserts."""
+        circ = Circuit(2).cx(0, 1)
+        results = db.add_circuits_batch([circ, Circuit(2).x(0), circ])
+
+        assert len(results) == 3
+        assert results[0] == results[2]
+        assert db.count_circuits() == 2
+
+    def test_add_circuits_batch_matches_add_circuit(self):
+        """Test batch insert produces the same rows as one-by-one inserts."""
+        existing = [Circuit(2).x(0).x(1), Circuit(2).cx(0, 1)]
+        batch = [
+            Circuit(2).x(1).x(0),
+            Circuit(2).cx(1, 0),
+            Circuit(3).cx(0, 1).x(2),
+            Circuit(2).x(0).x(1),
+            Circuit(3).x(2).cx(0, 1),
+        ]
+        with CircuitDatabase(":memory:") as seq, CircuitDatabase(":memory:") as bat:
+            for circ in existing:
+                seq.add_circuit(circ)
+                bat.add_circuit(circ)
+
+            expected = [seq.add_circuit(circ) for circ in batch]
+            assert bat.add_circuits_batch(batch) == expected
+
+            for table in ["circuits", "equivalence_classes"]:
+                query = f"SELECT * FROM {table} ORDER BY id"
+                seq_rows = [dict(r) for r in seq.conn.execute(query)]
+                bat_rows = [dict(r) for r in bat.conn.execute(query)]
+                for row in seq_rows + bat_rows:
+                    row.pop("created_at")
+                assert seq_rows == bat_rows
+
+    def test_add_circuits_batch_parallel(self):
+        """Test process-pool canonicalization gives the same result as in-process."""
+        batch = [Circuit(2).x(0).x(1), Circuit(2).x(1).x(0), Circuit(3).cx(0, 1).x(2)]
+        with CircuitDatabase(":memory:") as seq, CircuitDatabase(":memory:") as par:
+            expected = seq.add_circuits_batch(batch, workers=1)
+            assert par.add_circuits_batch(batch, workers=2) == expected
+
+    def test_reinsert_skips_canonicalization(self, db, monkeypatch):
+        """Test exact re-inserts are resolved from the stored gate list alone."""
+        import database.db as db_module
+        
+        circ = Circuit(3).mcx([0, 2], 1).x(2)
+        expected = db.add_circuit(circ)
+        
+        def fail(*_):
+            raise AssertionError("canonicalized a stored circuit")
+        monkeypatch.setattr(db_module, "canonical_repr", fail)
+        
+        assert db.add_circuit(circ) == expected
+        assert db.add_circuits_batch([circ, circ]) == [expected, expected]
+
+    def test_rejects_older_schema(self, tmp_path):
+        """Test a file with pre-BLOB tables (user_version 0) refuses to open."""
+        path = tmp_path / "old.db"
+        with CircuitDatabase(path) as db:
+            db.conn.execute("PRAGMA user_version = 0")
+        
+        with pytest.raises(ValueError, match="rebuild"):
+            CircuitDatabase(path)
+    
+    def test_add_circuits_batch_rollback(self, db, monkeypatch):
+        """Test a failing batch leaves the database unchanged."""
+        # The class-size update runs after classes and circuits are written
+        monkeypatch.setattr("database.db._SQL_ADD_CLASS_SIZE", "UPDATE no_such_table SET x = ?")
+        with pytest.raises(sqlite3.OperationalError):
+            db.add_circuits_batch([Circuit(2).cx(0, 1), Circuit(3).mcx([0, 1], 2)])
+
+        assert db.count_circuits() == 0
+        assert db.count_equivalence_classes() == 0
+
+
+class TestTemplateRecord:
+    """Tests for LMDB template record serialization."""
+    
+    def test_roundtrip(self):
+        """Test to_bytes/from_bytes/view_from_bytes agree."""
+        record = TemplateRecord(
+            template_id=7, basis_id=1, width=4, gate_count=2,
+            canonical_hash=bytes(range(16)), family_hash=bytes(16),
+            origin=OriginKind.UNROLL, origin_template_id=3, unroll_ops=5,
+            gates_encoded=bytes([0, 1, 2, 0, 1, 2]),
+        )
+        data = record.to_bytes()
+        
+        assert len(data) == 59 + 6
+        assert TemplateRecord.from_bytes(data) == record
+        view = TemplateRecord.view_from_bytes(data)
+        assert isinstance(view.gates_encoded, memoryview)
+        assert view == record
+    
+    def test_gate_encoding(self):
+        """Test the tuple fast path matches the generic encoder and decodes back."""
+        gates = [(2, 0, 1), (0, 1, 3), (2, 0, 1)]
+        data = encode_gates_eca57_tuples(gates)
+        
+        assert data == encode_gates_eca57(gates)
+        assert decode_gates_eca57(data) == gates
+        assert decode_gates_eca57(memoryview(data)) == gates
+        assert list(iter_gates_eca57(data)) == gates
+
+    def test_witness_roundtrip(self):
+        """Test WitnessRecord serializes to a fixed header plus the gate bytes."""
+        record = WitnessRecord(
+            witness_id=11, basis_id=1, width=5, witness_len=2,
+            witness_hash=bytes(range(16)), gates_encoded=bytes([0, 1, 2, 3, 4, 0]),
+            source_template_id=9,
+        )
+        data = record.to_bytes()
+        
+        assert len(data) == 38 + 6
+        assert WitnessRecord.from_bytes(data) == record
+        
+        view = WitnessRecord.view_from_bytes(data)
+        assert isinstance(view.gates_encoded, memoryview)
+        assert view.gates_encoded == record.gates_encoded
+    
+    def test_kgram_tokens_match_canonicalize(self):
+        """Test the window_token fast path gives canonicalize's hash prefix."""
+        basis = ECA57Basis()
+        gates = [(3, 0, 1), (1, 2, 4), (0, 3, 2), (4, 1, 0)]
+        expected = [
+            int.from_bytes(basis.canonicalize(gates[i:i + 3], 5)[1][:8], "little")
+            for i in range(2)
+        ]
+        
+        assert compute_kgram_tokens(gates, 3, basis, 5) == expected
+
+
+
+class TestTemplateStore:
+    """Tests for LMDB template storage."""
+    
+    @staticmethod
+    def _dump(env):
+        with env.read_txn() as txn:
+            return {name: list(txn.cursor(db=env._dbs[name]).iternext()) for name in ALL_DBS}
+    
+    def test_put_templates_bulk_keeps_first_of_repeated_keys(self, tmp_path):
+        """Test repeated keys in one bulk put keep the record passed first."""
+        h = bytes(16)
+        with TemplateDBEnv(tmp_path / "db") as env:
+            with env.write_txn() as txn:
+                # The first record sorts after the second by value
+                added = env.put_templates_bulk(txn, [(1, 3, 2, h, b"y"), (1, 3, 2, h, b"x")])
+            assert added == 1
+            with env.read_txn() as txn:
+                assert env.get_template(txn, 1, 3, 2, h) == b"y"
+    
+    def test_rejects_other_schema_version(self, tmp_path):
+        """Test a database from another schema version refuses to open."""
+        with TemplateDBEnv(tmp_path / "db") as env:
+            with env.write_txn() as txn:
+                env.put_meta(txn, "schema_version", struct.pack("<I", SCHEMA_VERSION - 1))
+        
+        with pytest.raises(ValueError, match="rebuild"):
+            TemplateDBEnv(tmp_path / "db")
+    
+    def test_unroll_and_insert_many_matches_sequential(self, tmp_path):
+        """Test parallel multi-seed unrolling writes exactly what per-seed unrolling does."""
+        seeds = [[(0, 1, 2), (1, 2, 3), (0, 1, 2)], [(2, 0, 1), (3, 1, 0), (2, 0, 1)]]
+        config = UnrollConfig(swap_dfs_budget=50, max_permutations=6)
+        dumps = []
+        for name, workers in [("seq", None), ("par", 2)]:
+            with TemplateDBEnv(tmp_path / name) as env:
+                store = TemplateStore(env, ECA57Basis())
+                records = [(store.insert_template(g, 4, OriginKind.SAT), g) for g in seeds]
+                if workers is None:
+                    counts = [unroll_and_insert(store, r, g, 4, config) for r, g in records]
+                    totals = tuple(map(sum, zip(*counts)))
+                else:
+                    totals = unroll_and_insert_many(store, records, 4, config, workers=workers)
+                dumps.append((totals, self._dump(env)))
+        
+        assert dumps[0] == dumps[1]
+        assert dumps[0][0][0] > 0
+    
+    def test_witnesses_from_templates_match_direct_insert(self, tmp_path):
+        """Test the memoized template path writes what insert_witness does."""
+        prefix = [(0, 1, 2), (1, 2, 3), (0, 1, 2)]
+        bodies = [[(2, 0, 1), (3, 1, 0), (2, 0, 1)], [(3, 2, 1), (2, 3, 0), (1, 0, 2)]]
+        dumps = []
+        for name in ("template", "direct"):
+            with TemplateDBEnv(tmp_path / name) as env:
+                store = TemplateStore(env, ECA57Basis())
+                witnesses = WitnessStore(env, ECA57Basis())
+                records = [store.insert_template(prefix + b, 4, OriginKind.SAT) for b in bodies]
+                for record, body in zip(records, bodies):
+                    if name == "template":
+                        witnesses.build_witnesses_from_template(record)
+                    else:
+                        witnesses.insert_witness((prefix + body)[:4], 4, record.template_id)
+                dumps.append(self._dump(env))
+        
+        assert dumps[0] == dumps[1]
+    
+    def test_witness_lookups_see_later_inserts(self, tmp_path):
+        """Test the cached read txn is replaced after a write."""
+        gates = [(0, 1, 2), (1, 2, 3), (0, 1, 2)]
+        with TemplateDBEnv(tmp_path / "db") as env:
+            witnesses = WitnessStore(env, ECA57Basis())
+            canonical, witness_hash = ECA57Basis().canonicalize(gates, 4)
+            token = compute_kgram_tokens(canonical, 2, ECA57Basis(), 4)[0]
+            assert witnesses.get_by_hash(4, 3, witness_hash) is None
+            assert witnesses.lookup_by_token(4, token) == []
+            
+            record = witnesses.insert_witness(gates, 4, 1)
+            
+            assert witnesses.get_by_hash(4, 3, witness_hash) == record
+            assert witnesses.lookup_by_token(4, token) == [record.witness_id]
             
-            count = db.count_equivalence_classes(width=2)
-            assert count == 2
+            # A write releases this thread's snapshot before it starts
+            stale = env.cached_read_txn()
+            with env.write_txn():
+                with pytest.raises(lmdb.Error):
+                    stale.get(b"schema_version")
 
 
 if __name__ == "__main__":
@@ -9,6 +9,10 @@ Generates more templates from seed templates using identity-preserving transform
 from __future__ import annotations
 
 import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import Iterator, Optional, Set, Any
 from dataclasses import dataclass
 
@@ -42,15 +46,15 @@ def permute_lines(gates: list, perm: list[int], basis: GateBasis) -> list:
     Returns:
         Gates with wires relabeled.
     """
-    result = []
-    for gate in gates:
-        wires = basis.touched_wires(gate)
-        new_wires = [perm[w] for w in wires]
-        
-        # Reconstruct gate (ECA57 specific for now)
-        result.append(tuple(new_wires))
-    
-    return result
+    # Reconstruct gate (ECA57 specific for now)
+    return [(perm[t], perm[c1], perm[c2]) for t, c1, c2 in _wire_tuples(gates, basis)]
+
+
+def _wire_tuples(gates: list, basis: GateBasis) -> list:
+    """Gates as (target, ctrl1, ctrl2) tuples, converting gate objects if needed."""
+    if all(type(gate) is tuple and len(gate) == 3 for gate in gates):
+        return gates
+    return [tuple(basis.touched_wires(gate)) for gate in gates]
 
 
 def rotate(gates: list, r: int) -> list:
@@ -72,14 +76,39 @@ def rotate(gates: list, r: int) -> list:
     return gates[r:] + gates[:r]
 
 
-def adjacent_commuting_pairs(gates: list, basis: GateBasis) -> Iterator[int]:
+def _smallest_rotation_period(gates: list) -> int:
+    """Smallest r > 0 with rotate(gates, r) == gates (len(gates) if aperiodic)."""
+    n = len(gates)
+    for r in range(1, n):
+        if n % r == 0 and gates[r:] + gates[:r] == gates:
+            return r
+    return n
+
+
+def adjacent_commuting_pairs(
+    gates: list, basis: GateBasis, cache: Optional[dict] = None
+) -> Iterator[int]:
     """Find indices where adjacent gates commute.
     
+    Args:
+        gates: List of gates.
+        basis: Gate basis.
+        cache: Optional (gate, gate) -> bool memo of basis.commutes.
+    
     Yields:
         Index i where gates[i] and gates[i+1] commute.
     """
+    if cache is None:
+        for i in range(len(gates) - 1):
+            if basis.commutes(gates[i], gates[i + 1]):
+                yield i
+        return
     for i in range(len(gates) - 1):
-        if basis.commutes(gates[i], gates[i + 1]):
+        pair = (gates[i], gates[i + 1])
+        commutes = cache.get(pair)
+        if commutes is None:
+            commutes = cache[pair] = basis.commutes(*pair)
+        if commutes:
             yield i
 
 
@@ -95,6 +124,7 @@ def gate_swap_dfs(
     width: int,
     basis: GateBasis,
     max_nodes: int = 10000,
+    initial_hash: Optional[bytes] = None,
 ) -> Iterator[list]:
     """Enumerate template variants via commuting gate swaps.
     
@@ -107,30 +137,76 @@ def gate_swap_dfs(
         width: Circuit width.
         basis: Gate basis.
         max_nodes: Budget for exploration.
+        initial_hash: Canonical hash of gates, if the caller already has it.
         
     Yields:
         Gate lists (including the original).
     """
+    # Only the hash is needed to seed the visited set
+    initial = None if initial_hash is None else (None, initial_hash)
+    for current, _ in _swap_bfs(gates, width, basis, max_nodes, initial):
+        yield current
+
+
+def _swap_bfs(
+    gates: list,
+    width: int,
+    basis: GateBasis,
+    max_nodes: int,
+    initial: Optional[tuple[list, bytes]],
+    hashes: Optional[dict] = None,
+    commute_cache: Optional[dict] = None,
+) -> Iterator[tuple[list, tuple[list, bytes]]]:
+    """gate_swap_dfs that also yields each node's (canonical_gates, canonical_hash).
+    
+    hashes memoizes basis.canonicalize by raw gate tuple and commute_cache
+    memoizes basis.commutes by gate pair; both may be shared across calls.
+    """
+    if hashes is None:
+        hashes = {}
+    
     # Get canonical form of initial
-    _, initial_hash = basis.canonicalize(gates, width)
+    if initial is None:
+        initial = _cached_canonical(gates, tuple(gates), width, basis, hashes)
     
-    visited: Set[bytes] = {initial_hash}
-    queue = [gates]
+    visited: Set[bytes] = {initial[1]}
+    queue = deque([(gates, initial)])
     node_count = 0
     
     while queue and node_count < max_nodes:
-        current = queue.pop(0)
+        current, current_canonical = queue.popleft()
         node_count += 1
-        yield current
+        yield current, current_canonical
         
         # Try all commuting swaps
-        for idx in adjacent_commuting_pairs(current, basis):
+        for idx in adjacent_commuting_pairs(current, basis, commute_cache):
             swapped = swap_at(current, idx)
-            _, swap_hash = basis.canonicalize(swapped, width)
+            swap_canonical = _cached_canonical(swapped, tuple(swapped), width, basis, hashes)
             
-            if swap_hash not in visited:
-                visited.add(swap_hash)
-                queue.append(swapped)
+            if swap_canonical[1] not in visited:
+                visited.add(swap_canonical[1])
+                queue.append((swapped, swap_canonical))
+
+
+def _cached_canonical(
+    gates: list, key: tuple, width: int, basis: GateBasis, hashes: dict
+) -> tuple[list, bytes]:
+    """basis.canonicalize(gates, width), memoized in hashes under key."""
+    canonical = hashes.get(key)
+    if canonical is None:
+        canonical = hashes[key] = basis.canonicalize(gates, width)
+    return canonical
+
+
+@lru_cache(maxsize=16)
+def _perms_for_width(width: int, limit: int) -> tuple[tuple[int, ...], ...]:
+    """First limit permutations of range(width) in lexicographic order, minus the identity.
+    
+    Only the needed prefix is enumerated (not all width! permutations),
+    and the table is built once per (width, limit).
+    """
+    # The identity is always first in lexicographic order
+    return tuple(itertools.islice(itertools.permutations(range(width)), 1, max(limit, 1)))
 
 
 @dataclass
@@ -150,7 +226,18 @@ def unroll_template(
     basis: GateBasis,
     config: Optional[UnrollConfig] = None,
 ) -> Iterator[tuple[list, int]]:
-    """Generate all variants of a template via unrolling.
+    """Generate all distinct variants of a template via unrolling.
+    
+    Variants are produced lazily in a fixed order (original, mirror,
+    rotations and their mirrors, then each of those under every wire
+    permutation, each expanded by swap DFS) and only the first variant
+    per canonical hash is yielded. A start variant whose canonical form
+    was already expanded is skipped, since its swap space is a relabeling
+    of one already explored.
+    
+    Canonical hashes and gate commutation are memoized for the whole
+    call. Canonicalization is invariant under wire relabeling (see
+    GateBasis), so permuted variants reuse their base variant's hash.
     
     Args:
         gates: Original gate list.
@@ -161,53 +248,115 @@ def unroll_template(
     Yields:
         (variant_gates, unroll_ops_bitfield) tuples.
     """
+    for variant, ops, _ in _unroll_variants(gates, width, basis, config):
+        yield (variant, ops)
+
+
+def _unroll_variants(
+    gates: list,
+    width: int,
+    basis: GateBasis,
+    config: Optional[UnrollConfig] = None,
+) -> Iterator[tuple[list, int, tuple[list, bytes]]]:
+    """unroll_template that also yields each variant's (canonical_gates, canonical_hash).
+    
+    Canonical gates are invariant under wire relabeling just like the
+    hash, so permuted variants share their base variant's result.
+    """
     config = config or UnrollConfig()
     
+    hashes: dict = {}
+    commute_cache: dict = {}
+    expanded: Set[bytes] = set()
+    yielded: Set[bytes] = set()
+    for variant, ops, key in _start_variants(gates, width, basis, config):
+        canonical = _cached_canonical(variant, key, width, basis, hashes)
+        if canonical[1] in expanded:
+            continue
+        expanded.add(canonical[1])
+        
+        if not config.do_swap_dfs:
+            yield (variant, ops, canonical)
+            continue
+        for swapped, swap_canonical in _swap_bfs(
+            variant, width, basis, config.swap_dfs_budget, canonical,
+            hashes, commute_cache,
+        ):
+            if swap_canonical[1] not in yielded:
+                yielded.add(swap_canonical[1])
+                yield (swapped, ops | UNROLL_SWAP, swap_canonical)
+
+
+def _start_variants(
+    gates: list,
+    width: int,
+    basis: GateBasis,
+    config: UnrollConfig,
+) -> Iterator[tuple[list, int, tuple]]:
+    """Lazily generate mirror x rotate x permute variants (before swap DFS).
+    
+    Yields:
+        (variant_gates, unroll_ops_bitfield, hash_key) tuples, where
+        hash_key is the raw gate tuple of the unpermuted base variant.
+    """
     # Start with original
     base_variants = [(gates, 0)]
     
+    # A palindromic template's mirrors are its own rotations
+    mirrored = mirror(gates, basis)
+    do_mirror = config.do_mirror and mirrored != gates
+    
     # Apply mirror
-    if config.do_mirror:
-        mirrored = mirror(gates, basis)
+    if do_mirror:
         base_variants.append((mirrored, UNROLL_MIRROR))
     
-    # Apply rotations
+    # Apply rotations; only the first period of them are distinct
     if config.do_rotate and len(gates) > 1:
-        for r in range(1, len(gates)):
+        for r in range(1, _smallest_rotation_period(gates)):
             rotated = rotate(gates, r)
             base_variants.append((rotated, UNROLL_ROTATE))
             
-            if config.do_mirror:
-                rot_mir = mirror(rotated, basis)
-                base_variants.append((rot_mir, UNROLL_ROTATE | UNROLL_MIRROR))
+            if do_mirror:
+                base_variants.append((mirror(rotated, basis), UNROLL_ROTATE | UNROLL_MIRROR))
+    
+    for variant, ops in base_variants:
+        yield (variant, ops, tuple(variant))
     
     # Apply wire permutations
-    permuted_variants = []
     if config.do_permute:
-        # Generate permutations of [0..width-1]
-        perms = list(itertools.permutations(range(width)))
-        
-        # Limit if too many
-        if len(perms) > config.max_permutations:
-            perms = perms[:config.max_permutations]
+        perms = _perms_for_width(width, config.max_permutations)
         
         for variant, ops in base_variants:
+            key = tuple(variant)
+            wires = _wire_tuples(variant, basis)
             for perm in perms:
-                if list(perm) == list(range(width)):
-                    continue  # Skip identity permutation
-                permuted = permute_lines(variant, list(perm), basis)
-                permuted_variants.append((permuted, ops | UNROLL_PERMUTE))
+                yield (permute_lines(wires, perm, basis), ops | UNROLL_PERMUTE, key)
+
+
+def unroll_canonical(
+    gates: list,
+    width: int,
+    basis: GateBasis,
+    config: Optional[UnrollConfig] = None,
+) -> list[tuple[list, bytes, int]]:
+    """Unroll a template and canonicalize every variant.
     
-    all_variants = base_variants + permuted_variants
+    Needs no store, so it can run in a worker process.
     
-    # Apply swap DFS to each variant
-    if config.do_swap_dfs:
-        for variant, ops in all_variants:
-            for swapped in gate_swap_dfs(variant, width, basis, config.swap_dfs_budget):
-                yield (swapped, ops | UNROLL_SWAP)
-    else:
-        for variant, ops in all_variants:
-            yield (variant, ops)
+    Returns:
+        (canonical_gates, canonical_hash, unroll_ops) entries, one per
+        distinct variant, as taken by TemplateStore.bulk_insert_prehashed.
+    """
+    return [
+        (canonical_gates, canonical_hash, ops)
+        for _, ops, (canonical_gates, canonical_hash)
+        in _unroll_variants(gates, width, basis, config)
+    ]
+
+
+def _unroll_canonical_worker(payload: tuple) -> list[tuple[list, bytes, int]]:
+    """Process-pool entry point for unroll_canonical."""
+    return unroll_canonical(*payload)
 
 
 def unroll_and_insert(
@@ -227,26 +376,82 @@ def unroll_and_insert(
         config: Unrolling configuration.
         
     Returns:
-        (inserted_count, duplicate_count)
+        (inserted_count, duplicate_count); duplicates are distinct variants
+        that were already stored.
     """
-    inserted = 0
-    duplicates = 0
-    
-    for variant_gates, unroll_ops in unroll_template(
-        gates, width, store.basis, config
-    ):
-        record = store.insert_template(
-            gates=variant_gates,
-            width=width,
-            origin=OriginKind.UNROLL,
-            origin_template_id=source_record.template_id,
-            unroll_ops=unroll_ops,
-            family_hash=source_record.family_hash,
-        )
+    entries = unroll_canonical(gates, width, store.basis, config)
+    return _insert_unrolled(store, source_record, entries, width)
+
+
+def unroll_and_insert_many(
+    store: TemplateStore,
+    seeds: list[tuple[TemplateRecord, list]],
+    width: int,
+    config: Optional[UnrollConfig] = None,
+    workers: Optional[int] = None,
+) -> tuple[int, int]:
+    """unroll_and_insert for many seeds, unrolling them in parallel.
+    
+    Unrolling and canonicalization are independent per seed and run in a
+    process pool; only this process touches LMDB. Results are written in
+    seed order, so the store ends up identical to calling
+    unroll_and_insert on each seed in turn.
+    
+    Args:
+        store: Template store.
+        seeds: (source_record, gates) pairs.
+        width: Circuit width.
+        config: Unrolling configuration.
+        workers: Worker processes. None uses os.cpu_count() - 1; 1 stays
+                 in-process.
         
-        if record is not None:
-            inserted += 1
-        else:
-            duplicates += 1
+    Returns:
+        Total (inserted_count, duplicate_count) over all seeds.
+    """
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+    
+    payloads = [(gates, width, store.basis, config) for _, gates in seeds]
+    if workers <= 1 or len(seeds) <= 1:
+        return _insert_all(store, seeds, map(_unroll_canonical_worker, payloads), width)
     
+    chunksize = max(1, len(seeds) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        # map yields in submission order while workers run ahead
+        results = ex.map(_unroll_canonical_worker, payloads, chunksize=chunksize)
+        return _insert_all(store, seeds, results, width)
+
+
+def _insert_all(
+    store: TemplateStore,
+    seeds: list[tuple[TemplateRecord, list]],
+    results: Iterator[list[tuple[list, bytes, int]]],
+    width: int,
+) -> tuple[int, int]:
+    """Write each seed's unroll_canonical entries in order; returns summed counts."""
+    inserted = duplicates = 0
+    for (record, _), entries in zip(seeds, results):
+        n_new, n_dup = _insert_unrolled(store, record, entries, width)
+        inserted += n_new
+        duplicates += n_dup
     return inserted, duplicates
+
+
+def _insert_unrolled(
+    store: TemplateStore,
+    source_record: TemplateRecord,
+    entries: list[tuple[list, bytes, int]],
+    width: int,
+) -> tuple[int, int]:
+    """Write one seed's unroll_canonical entries; returns (inserted, duplicates)."""
+    # unroll_template yields distinct variants, so the batch needs no dedupe
+    records = store.bulk_insert_prehashed(
+        entries,
+        width=width,
+        origin=OriginKind.UNROLL,
+        origin_template_id=source_record.template_id,
+        family_hash=source_record.family_hash,
+    )
+    
+    inserted = len(records)
+    return inserted, len(entries) - inserted
@@ -7,14 +7,24 @@ Witnesses are shortened prefixes of templates used for:
 from __future__ import annotations
 
 import struct
+from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional, Iterator, List
 
 import blake3
 
 from database.lmdb_env import TemplateDBEnv
-from database.basis import GateBasis, ECA57Basis, BASIS_ECA57
-from database.templates import TemplateRecord, decode_gates_eca57
+from database.basis import GateBasis, ECA57Basis, BASIS_ECA57, HASH_SIZE, get_basis
+from database.templates import TemplateRecord, decode_gates_eca57, encode_gates_eca57_tuples
+
+
+# Fixed record header (38 bytes), see WitnessRecord.to_bytes
+_HDR = struct.Struct(f"<QBBH{HASH_SIZE}sQH")
+_HDR_SIZE = _HDR.size
+
+# 64-bit prefilter token from the head of a canonical hash
+_TOKEN = struct.Struct("<Q").unpack_from
 
 
 @dataclass
@@ -26,7 +36,7 @@ class WitnessRecord:
         basis_id: Gate basis
         width: Number of wires
         witness_len: Number of gates in witness
-        witness_hash: 32-byte canonical hash
+        witness_hash: 16-byte canonical hash
         gates_encoded: Packed gate bytes
         source_template_id: One representative source template
     """
@@ -46,13 +56,12 @@ class WitnessRecord:
             basis_id: u8
             width: u8
             witness_len: u16
-            witness_hash: 32 bytes
+            witness_hash: 16 bytes
             source_template_id: u64
             gates_len: u16
             gates_encoded: variable
         """
-        header = struct.pack(
-            "<QBBH32sQH",
+        header = _HDR.pack(
             self.witness_id,
             self.basis_id,
             self.width,
@@ -64,16 +73,19 @@ class WitnessRecord:
         return header + self.gates_encoded
     
     @classmethod
-    def from_bytes(cls, data: bytes) -> "WitnessRecord":
-        """Deserialize from bytes."""
-        header_size = 8 + 1 + 1 + 2 + 32 + 8 + 2  # = 54 bytes
-        
+    def from_bytes(cls, data: bytes | memoryview) -> "WitnessRecord":
+        """Deserialize from bytes (the record owns a copy of its gates)."""
+        record = cls.view_from_bytes(data)
+        record.gates_encoded = bytes(record.gates_encoded)
+        return record
+    
+    @classmethod
+    def view_from_bytes(cls, data: bytes | memoryview) -> "WitnessRecord":
+        """Deserialize without copying the gates (see TemplateRecord.view_from_bytes)."""
         (witness_id, basis_id, width, witness_len,
-         witness_hash, source_template_id, gates_len) = struct.unpack(
-            "<QBBH32sQH", data[:header_size]
-        )
+         witness_hash, source_template_id, gates_len) = _HDR.unpack_from(data, 0)
         
-        gates_encoded = data[header_size:header_size + gates_len]
+        gates_encoded = memoryview(data)[_HDR_SIZE:_HDR_SIZE + gates_len]
         
         return cls(
             witness_id=witness_id,
@@ -111,6 +123,12 @@ def compute_kgram_tokens(gates: list, k: int, basis: GateBasis, width: int) -> L
     if len(gates) < k:
         return []
     
+    if all(type(g) is tuple for g in gates):
+        return [
+            basis.window_token(tuple(gates[i:i + k]), width)
+            for i in range(len(gates) - k + 1)
+        ]
+    
     tokens = []
     for i in range(len(gates) - k + 1):
         window = gates[i:i + k]
@@ -119,12 +137,24 @@ def compute_kgram_tokens(gates: list, k: int, basis: GateBasis, width: int) -> L
         _, window_hash = basis.canonicalize(window, width)
         
         # Take first 8 bytes as 64-bit token
-        token = struct.unpack("<Q", window_hash[:8])[0]
-        tokens.append(token)
+        tokens.append(_TOKEN(window_hash)[0])
     
     return tokens
 
 
+@lru_cache(maxsize=1 << 16)
+def _canonical_witness_eca57(prefix: bytes, width: int) -> tuple:
+    """(canonical gates, hash, encoded gates) of an encoded ECA57 prefix, memoized.
+    
+    Templates of a width share witness prefixes, so build-witnesses decodes
+    and canonicalizes each distinct prefix once.
+    """
+    canonical_gates, witness_hash = get_basis("eca57").canonicalize(
+        decode_gates_eca57(prefix), width
+    )
+    return tuple(canonical_gates), witness_hash, encode_gates_eca57_tuples(canonical_gates)
+
+
 class WitnessStore:
     """High-level witness storage API.
     
@@ -141,6 +171,9 @@ class WitnessStore:
     def __init__(self, env: TemplateDBEnv, basis: GateBasis, k_gram_sizes: List[int] = None):
         self.env = env
         self.basis = basis
+        # Per-insert invariants, looked up once
+        self._basis_id = basis.basis_id
+        self._canonicalize = basis.canonicalize
         self.k_gram_sizes = k_gram_sizes or [2, 3]  # Default: 2-grams and 3-grams
     
     def insert_witness(
@@ -159,105 +192,132 @@ class WitnessStore:
         Returns:
             WitnessRecord if inserted, None if duplicate.
         """
-        witness_len = len(gates)
+        with self.batch_insert() as txn:
+            return self.insert_witness_in_txn(txn, gates, width, source_template_id)
+    
+    @contextmanager
+    def batch_insert(self):
+        """Write transaction shared by several insert_witness_in_txn calls.
         
+        Commits once on exit (aborts if the block raises).
+        """
+        with self.env.write_txn() as txn:
+            yield txn
+    
+    def insert_witness_in_txn(
+        self,
+        txn,
+        gates: list,
+        width: int,
+        source_template_id: int,
+    ) -> Optional[WitnessRecord]:
+        """insert_witness inside an existing write transaction (see batch_insert)."""
         # Canonicalize
-        canonical_gates, witness_hash = self.basis.canonicalize(gates, width)
+        canonical_gates, witness_hash = self._canonicalize(gates, width)
         
         # Encode gates
-        if self.basis.basis_id == BASIS_ECA57:
-            gates_encoded = b""
-            for g in canonical_gates:
-                if isinstance(g, tuple):
-                    gates_encoded += bytes([g[0], g[1], g[2]])
-                else:
-                    gates_encoded += bytes([g.target, g.ctrl1, g.ctrl2])
+        if self._basis_id == BASIS_ECA57:
+            gates_encoded = encode_gates_eca57_tuples(canonical_gates)
         else:
-            raise NotImplementedError(f"Witness encoding for basis {self.basis.basis_id}")
+            raise NotImplementedError(f"Witness encoding for basis {self._basis_id}")
         
-        with self.env.write_txn() as txn:
-            # Check for duplicate
-            existing = self.env.get_witness(
-                txn, self.basis.basis_id, width, witness_len, witness_hash
-            )
-            if existing is not None:
-                return None
-            
-            # Get new witness ID
-            witness_id = self.env.increment_witness_count(txn)
-            
-            # Create record
-            record = WitnessRecord(
-                witness_id=witness_id,
-                basis_id=self.basis.basis_id,
-                width=width,
-                witness_len=witness_len,
-                witness_hash=witness_hash,
-                gates_encoded=gates_encoded,
-                source_template_id=source_template_id,
-            )
-            
-            # Store
-            self.env.put_witness(
-                txn, self.basis.basis_id, width, witness_len,
-                witness_hash, record.to_bytes()
-            )
-            
-            # Add to prefilter
-            for k in self.k_gram_sizes:
-                tokens = compute_kgram_tokens(canonical_gates, k, self.basis, width)
-                for token in tokens:
-                    self.env.add_to_prefilter(
-                        txn, self.basis.basis_id, width, token, witness_id
-                    )
-            
-            return record
+        return self._insert_canonical_in_txn(
+            txn, canonical_gates, witness_hash, gates_encoded, width, source_template_id
+        )
+    
+    def _insert_canonical_in_txn(
+        self,
+        txn,
+        canonical_gates,
+        witness_hash: bytes,
+        gates_encoded: bytes,
+        width: int,
+        source_template_id: int,
+    ) -> Optional[WitnessRecord]:
+        """Insert an already canonicalized and encoded witness."""
+        env = self.env
+        basis_id = self._basis_id
+        witness_len = len(canonical_gates)
+        
+        # Next witness ID; only claimed if the put below is not a duplicate
+        witness_id = env.get_witness_count(txn) + 1
+        
+        # Create record
+        record = WitnessRecord(
+            witness_id=witness_id,
+            basis_id=basis_id,
+            width=width,
+            witness_len=witness_len,
+            witness_hash=witness_hash,
+            gates_encoded=gates_encoded,
+            source_template_id=source_template_id,
+        )
+        
+        # Store; put_witness doubles as the duplicate check
+        if not env.put_witness(
+            txn, basis_id, width, witness_len, witness_hash, record.to_bytes()
+        ):
+            return None
+        env.increment_witness_count(txn)
+        
+        # Add to prefilter
+        tokens = []
+        for k in self.k_gram_sizes:
+            tokens.extend(compute_kgram_tokens(canonical_gates, k, self.basis, width))
+        env.add_many_to_prefilter(txn, basis_id, width, tokens, witness_id)
+        
+        return record
     
     def build_witnesses_from_template(
         self,
         template: TemplateRecord,
+        txn=None,
     ) -> Optional[WitnessRecord]:
         """Extract and insert witness from a template.
         
         Args:
             template: Template record.
+            txn: Write transaction to insert in (see batch_insert); by
+                 default the insert commits on its own.
             
         Returns:
             WitnessRecord if inserted, None if duplicate.
         """
-        # Decode gates
-        if template.basis_id == BASIS_ECA57:
-            gates = decode_gates_eca57(template.gates_encoded)
-        else:
-            raise NotImplementedError(f"Gate decoding for basis {template.basis_id}")
-        
         # Compute witness length
-        witness_len = compute_witness_length(len(gates))
+        witness_len = compute_witness_length(template.gate_count)
         
-        # Extract witness (first witness_len gates)
-        witness_gates = gates[:witness_len]
+        # Canonicalize only the witness (first witness_len gates), keyed
+        # on a copy of its encoded bytes (a memoryview slice would keep the
+        # whole template record alive in the cache)
+        if template.basis_id == BASIS_ECA57 and self._basis_id == BASIS_ECA57:
+            canonical = _canonical_witness_eca57(
+                bytes(template.gates_encoded[:3 * witness_len]), template.width
+            )
+        else:
+            raise NotImplementedError(f"Gate decoding for basis {template.basis_id}")
         
-        return self.insert_witness(
-            witness_gates,
-            template.width,
-            template.template_id,
+        if txn is None:
+            with self.batch_insert() as txn:
+                return self._insert_canonical_in_txn(
+                    txn, *canonical, template.width, template.template_id
+                )
+        return self._insert_canonical_in_txn(
+            txn, *canonical, template.width, template.template_id
         )
     
     def lookup_by_token(self, width: int, token_hash: int) -> List[int]:
         """Lookup witness IDs by prefilter token."""
-        with self.env.read_txn() as txn:
-            return self.env.lookup_prefilter(
-                txn, self.basis.basis_id, width, token_hash
-            )
+        return self.env.lookup_prefilter(
+            self.env.cached_read_txn(), self._basis_id, width, token_hash
+        )
     
     def get_by_hash(
         self, width: int, witness_len: int, witness_hash: bytes
     ) -> Optional[WitnessRecord]:
         """Get witness by hash."""
-        with self.env.read_txn() as txn:
-            data = self.env.get_witness(
-                txn, self.basis.basis_id, width, witness_len, witness_hash
-            )
-            if data is None:
-                return None
-            return WitnessRecord.from_bytes(data)
+        data = self.env.get_witness(
+            self.env.cached_read_txn(), self._basis_id, width, witness_len, witness_hash
+        )
+        if data is None:
+            return None
+        return WitnessRecord.from_bytes(data)
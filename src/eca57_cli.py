@@ -11,8 +11,12 @@ from __future__ import annotations
 import argparse
 import json
 import time
+from itertools import islice
 from pathlib import Path
 
+# Witnesses inserted per LMDB write transaction in build-witnesses
+WITNESS_TXN_BATCH = 10_000
+
 
 def cmd_benchmark(args):
     """Run solver benchmark."""
@@ -150,48 +154,76 @@ def cmd_distill(args):
         print(f"\nSaved to {out} and {out.with_suffix('.txt')}")
 
 
+def _synthesize_cell(width: int, gc: int, solver: str):
+    """build-db worker: synthesize one (width, gc) cell and canonicalize it.
+    
+    Returns batch_canonicalize's (canonical gates, hashes) arrays.
+    """
+    from database.basis import batch_canonicalize
+    from synthesizers.eca57_dimgroup_synthesizer import ECA57DimGroupSynthesizer
+    
+    dimgroup = ECA57DimGroupSynthesizer(width, gc, solver).synthesize()
+    return batch_canonicalize(dimgroup.to_array(), width)
+
+
 def cmd_build_db(args):
     """Build LMDB database from SAT synthesis."""
-    from pathlib import Path
-    from database.lmdb_env import TemplateDBEnv
-    from database.basis import ECA57Basis
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+    from database.lmdb_env import TemplateDBEnv, LMDBConfig
+    from database.basis import get_basis
     from database.templates import TemplateStore, OriginKind
-    from synthesizers.eca57_dimgroup_synthesizer import ECA57DimGroupSynthesizer
+    
+    workers = args.workers or max(1, (os.cpu_count() or 1) - 1)
     
     print(f"Building LMDB database: {args.output}")
     print(f"Max width: {args.max_width}, Max GC: {args.max_gc}")
     print(f"Solver: {args.solver}")
+    print(f"Workers: {workers}")
     print("=" * 60)
     
     # Open LMDB environment
-    env = TemplateDBEnv(args.output)
-    basis = ECA57Basis()
+    env = TemplateDBEnv(args.output, LMDBConfig(bulk_load=True))
+    basis = get_basis("eca57")
     store = TemplateStore(env, basis)
     
     total_inserted = 0
     total_duplicates = 0
     start = time.time()
     
-    for width in range(3, args.max_width + 1):
-        for gc in range(2, args.max_gc + 1):
+    cells = [
+        (width, gc)
+        for width in range(3, args.max_width + 1)
+        for gc in range(2, args.max_gc + 1)
+    ]
+    
+    # Cells are synthesized in worker processes; this process is the only
+    # LMDB writer. Submitting the largest cells first balances the pool,
+    # while results are written in grid order so template IDs are stable.
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = {
+            cell: ex.submit(_synthesize_cell, *cell, args.solver)
+            for cell in sorted(cells, reverse=True)
+        }
+        for width, gc in cells:
             print(f"  Synthesizing [{width},{gc}]...", end=" ", flush=True)
+            canonical, hashes = futures.pop((width, gc)).result()
             
-            synth = ECA57DimGroupSynthesizer(width, gc, args.solver)
-            dimgroup = synth.synthesize()
-            
+            # Insert the whole group in one transaction
             inserted = 0
-            for circuit in dimgroup:
-                # Convert to gate tuples
-                gates = [(g.target, g.ctrl1, g.ctrl2) for g in circuit.gates]
-                record = store.insert_template(
-                    gates=gates,
-                    width=width,
-                    origin=OriginKind.SAT,
-                )
-                if record is not None:
-                    inserted += 1
-                else:
-                    total_duplicates += 1
+            with store.batch_insert() as txn:
+                for canonical_gates, canonical_hash in zip(canonical.tolist(), hashes):
+                    record = store.insert_template_canonical_in_txn(
+                        txn,
+                        [tuple(g) for g in canonical_gates],
+                        canonical_hash.tobytes(),
+                        width,
+                        origin=OriginKind.SAT,
+                    )
+                    if record is not None:
+                        inserted += 1
+                    else:
+                        total_duplicates += 1
             
             total_inserted += inserted
             print(f"inserted {inserted} (total: {total_inserted})")
@@ -208,18 +240,21 @@ def cmd_build_db(args):
 
 def cmd_unroll(args):
     """Expand templates via unrolling."""
-    from database.lmdb_env import TemplateDBEnv
-    from database.basis import ECA57Basis
+    from database.lmdb_env import TemplateDBEnv, LMDBConfig
+    from database.basis import get_basis
     from database.templates import TemplateStore, decode_gates_eca57
-    from database.unroll import unroll_and_insert, UnrollConfig
+    from database.unroll import unroll_and_insert_many, UnrollConfig
     
     print(f"Unrolling from database: {args.db}")
     print(f"Seed dimensions: {args.seed_dims}")
     print(f"DFS budget: {args.dfs_budget}")
+    print(f"Workers: {args.workers or 'auto'}")
     print("=" * 60)
     
-    env = TemplateDBEnv(args.db)
-    basis = ECA57Basis()
+    env = TemplateDBEnv(args.db, LMDBConfig(bulk_load=True))
+    if args.prefetch:
+        env.prefetch()
+    basis = get_basis("eca57")
     store = TemplateStore(env, basis)
     
     config = UnrollConfig(
@@ -233,27 +268,19 @@ def cmd_unroll(args):
     # Parse seed dims (e.g., "4x6" -> width=4, gc=6)
     width, gc = map(int, args.seed_dims.split("x"))
     
-    total_inserted = 0
-    total_duplicates = 0
-    seed_count = 0
-    
     print(f"Processing seeds from [{width},{gc}]...")
     
-    for record in store.iter_by_dims(width, gc):
-        seed_count += 1
-        gates = decode_gates_eca57(record.gates_encoded)
-        
-        inserted, dups = unroll_and_insert(
-            store, record, gates, width, config
-        )
-        total_inserted += inserted
-        total_duplicates += dups
-        
-        if seed_count % 10 == 0:
-            print(f"  Processed {seed_count} seeds, inserted {total_inserted}...")
+    # Seeds are read up front: unrolling writes to the same (width, gc) range
+    seeds = [
+        (record, decode_gates_eca57(record.gates_encoded))
+        for record in store.iter_by_dims(width, gc)
+    ]
+    total_inserted, total_duplicates = unroll_and_insert_many(
+        store, seeds, width, config, workers=args.workers
+    )
     
     print("=" * 60)
-    print(f"Processed {seed_count} seed templates")
+    print(f"Processed {len(seeds)} seed templates")
     print(f"Inserted: {total_inserted}, Duplicates: {total_duplicates}")
     
     env.close()
@@ -261,8 +288,8 @@ def cmd_unroll(args):
 
 def cmd_build_witnesses(args):
     """Build witness prefilter from templates."""
-    from database.lmdb_env import TemplateDBEnv
-    from database.basis import ECA57Basis
+    from database.lmdb_env import TemplateDBEnv, LMDBConfig
+    from database.basis import get_basis
     from database.templates import TemplateStore
     from database.witnesses import WitnessStore
     
@@ -270,8 +297,10 @@ def cmd_build_witnesses(args):
     print(f"Max width: {args.max_width}, Max GC: {args.max_gc}")
     print("=" * 60)
     
-    env = TemplateDBEnv(args.db)
-    basis = ECA57Basis()
+    env = TemplateDBEnv(args.db, LMDBConfig(bulk_load=True))
+    if args.prefetch:
+        env.prefetch()
+    basis = get_basis("eca57")
     template_store = TemplateStore(env, basis)
     witness_store = WitnessStore(env, basis)
     
@@ -281,12 +310,17 @@ def cmd_build_witnesses(args):
     for width in range(3, args.max_width + 1):
         for gc in range(2, args.max_gc + 1):
             inserted = 0
-            for record in template_store.iter_by_dims(width, gc):
-                witness = witness_store.build_witnesses_from_template(record)
-                if witness is not None:
-                    inserted += 1
-                else:
-                    total_duplicates += 1
+            # Read a chunk of templates, then insert its witnesses in one
+            # write transaction (one commit per chunk instead of per witness)
+            records = template_store.iter_by_dims(width, gc)
+            while chunk := list(islice(records, WITNESS_TXN_BATCH)):
+                with witness_store.batch_insert() as txn:
+                    for record in chunk:
+                        witness = witness_store.build_witnesses_from_template(record, txn)
+                        if witness is not None:
+                            inserted += 1
+                        else:
+                            total_duplicates += 1
             
             total_inserted += inserted
             if inserted > 0:
@@ -299,6 +333,18 @@ def cmd_build_witnesses(args):
     env.close()
 
 
+# Subcommand name -> handler; each handler imports its own dependencies
+COMMANDS = {
+    "benchmark": cmd_benchmark,
+    "synth": cmd_synth,
+    "collection": cmd_collection,
+    "distill": cmd_distill,
+    "build-db": cmd_build_db,
+    "unroll": cmd_unroll,
+    "build-witnesses": cmd_build_witnesses,
+}
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="ECA57 Identity Circuit Synthesis",
@@ -339,35 +385,30 @@ def main():
     build_db.add_argument("--max-gc", type=int, required=True, help="Maximum gate count")
     build_db.add_argument("-s", "--solver", default="glucose4", help="SAT solver")
     build_db.add_argument("-o", "--output", required=True, help="Output LMDB directory")
+    build_db.add_argument("--workers", type=int, default=None,
+                          help="Synthesis processes (default: all cores - 1)")
     
     # Unroll command (NEW)
     unroll = subparsers.add_parser("unroll", help="Expand templates via unrolling")
     unroll.add_argument("--db", required=True, help="LMDB database path")
     unroll.add_argument("--seed-dims", required=True, help="Seed dimensions (e.g., 4x6)")
     unroll.add_argument("--dfs-budget", type=int, default=1000, help="DFS budget per seed")
+    unroll.add_argument("--workers", type=int, default=None,
+                        help="Unroll processes (default: all cores - 1; 1 = in-process)")
+    unroll.add_argument("--prefetch", action="store_true",
+                        help="Read the whole database file into the page cache first")
     
     # Build-witnesses command (NEW)
     build_wit = subparsers.add_parser("build-witnesses", help="Build witness prefilter")
     build_wit.add_argument("--db", required=True, help="LMDB database path")
     build_wit.add_argument("--max-width", type=int, required=True, help="Maximum width")
     build_wit.add_argument("--max-gc", type=int, required=True, help="Maximum gate count")
+    build_wit.add_argument("--prefetch", action="store_true",
+                           help="Read the whole database file into the page cache first")
     
     args = parser.parse_args()
     
-    if args.command == "benchmark":
-        cmd_benchmark(args)
-    elif args.command == "synth":
-        cmd_synth(args)
-    elif args.command == "collection":
-        cmd_collection(args)
-    elif args.command == "distill":
-        cmd_distill(args)
-    elif args.command == "build-db":
-        cmd_build_db(args)
-    elif args.command == "unroll":
-        cmd_unroll(args)
-    elif args.command == "build-witnesses":
-        cmd_build_witnesses(args)
+    COMMANDS[args.command](args)
 
 
 if __name__ == "__main__":
@@ -13,7 +13,6 @@ from __future__ import annotations
 
 from typing import Optional, Callable
 from circuit.eca57_collection import ECA57Collection
-from circuit.eca57_dim_group import ECA57DimGroup
 from gates.eca57 import ECA57Circuit
 
 
@@ -105,28 +104,11 @@ class ECA57ExCircDistiller:
                 gc_a = (exc_gc - 1) * 2  # Even length identity
                 gc_b = gc_a + 1  # Odd length identity
                 
-                ext_list = []
-                
-                # From even-length identities
-                if gc_a >= 2 and gc_a <= self._max_gate_count:
-                    if width in self._collection._data and gc_a in self._collection._data.get(width, {}):
-                        dg_a = self._collection._data[width].get(gc_a)
-                        if dg_a:
-                            for circ in dg_a:
-                                ext_list.append(circ.min_slice())
-                
-                # From odd-length identities
-                if gc_b >= 2 and gc_b <= self._max_gate_count:
-                    if width in self._collection._data and gc_b in self._collection._data.get(width, {}):
-                        dg_b = self._collection._data[width].get(gc_b)
-                        if dg_b:
-                            for circ in dg_b:
-                                ext_list.append(circ.min_slice())
-                
-                if ext_list:
-                    if excircuits._data[width][exc_gc] is None:
-                        excircuits._data[width][exc_gc] = ECA57DimGroup(width, exc_gc)
-                    excircuits._data[width][exc_gc].extend(ext_list)
+                # Slice each source group as a whole (one group per gate count)
+                for gc in (gc_a, gc_b):
+                    dg = self._collection.group(width, gc)
+                    if dg:
+                        excircuits.group_or_new(width, exc_gc).join(dg.min_slices())
         
         return excircuits
 
@@ -17,10 +17,15 @@ Truth table for the control condition:
     0   1   |  0  
     1   0   |  1
     1   1   |  1
+
+NOT is written bitwise everywhere: c2 ^ 1 on single bits, and ~c2 masked to
+2^width bits on the packed truth-table columns (one bit per input row).
 """
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import permutations
 from typing import List, Tuple
 
 
@@ -56,7 +61,7 @@ class ECA57Gate:
         c2 = state[self.ctrl2]
         
         # target ^= (c1 OR NOT c2)
-        condition = c1 | (1 - c2)
+        condition = c1 | (c2 ^ 1)
         result[self.target] ^= condition
         
         return result
@@ -126,11 +131,27 @@ class ECA57Circuit:
         Returns:
             Final state after all gates.
         """
+        # One copy for the whole circuit, gates applied in place
         result = state.copy()
         for gate in self._gates:
-            result = gate.apply(result)
+            result[gate.target] ^= result[gate.ctrl1] | (result[gate.ctrl2] ^ 1)
         return result
     
+    def compute_truth_table_packed(self) -> List[int]:
+        """Compute the truth table bit-parallel, one column per wire.
+        
+        Column w is an int whose bit i is wire w's output for input i, so
+        each gate is a single word-parallel XOR over all 2^width inputs.
+        
+        Returns:
+            List of width output columns.
+        """
+        cols = list(identity_columns(self._width))
+        mask = (1 << (1 << self._width)) - 1
+        for gate in self._gates:
+            cols[gate.target] ^= (cols[gate.ctrl1] | ~cols[gate.ctrl2]) & mask
+        return cols
+    
     def compute_truth_table(self) -> List[List[int]]:
         """Compute the full truth table of the circuit.
         
@@ -138,24 +159,20 @@ class ECA57Circuit:
             List of output states for each input (0 to 2^width - 1).
         """
         rows = 2 ** self._width
-        table = []
-        
-        for i in range(rows):
-            # Convert int to bit list
-            state = [(i >> bit) & 1 for bit in range(self._width)]
-            output = self.apply(state)
-            table.append(output)
-        
-        return table
+        # Unpack each column to bits (row 0 first), then transpose to rows
+        bits = [
+            [int(b) for b in reversed(format(col, f"0{rows}b"))]
+            for col in self.compute_truth_table_packed()
+        ]
+        return [list(row) for row in zip(*bits)]
     
     def is_identity(self) -> bool:
-        """Check if circuit implements identity function."""
-        tt = self.compute_truth_table()
-        for i, output in enumerate(tt):
-            expected = [(i >> bit) & 1 for bit in range(self._width)]
-            if output != expected:
-                return False
-        return True
+        """Check if circuit implements identity function.
+        
+        Compares packed output columns (see compute_truth_table_packed) to
+        the identity's; no per-row table is built.
+        """
+        return tuple(self.compute_truth_table_packed()) == identity_columns(self._width)
     
     def __str__(self) -> str:
         """ASCII representation of the circuit."""
@@ -172,6 +189,17 @@ class ECA57Circuit:
     def __hash__(self):
         return hash((self._width, tuple(self._gates)))
     
+    def _key(self) -> Tuple[Tuple[int, int, int], ...]:
+        """Gate tuple sequence, used as a set/dict key for this circuit."""
+        return tuple([(g.target, g.ctrl1, g.ctrl2) for g in self._gates])
+    
+    @staticmethod
+    def _from_key(width: int, key) -> "ECA57Circuit":
+        """Circuit from (target, ctrl1, ctrl2) tuples, sharing interned gates."""
+        new = ECA57Circuit(width)
+        new._gates = [_GATES.get(g) or _intern_gate(g) for g in key]
+        return new
+    
     def copy(self) -> "ECA57Circuit":
         """Create a copy of this circuit."""
         new = ECA57Circuit(self._width)
@@ -196,15 +224,15 @@ class ECA57Circuit:
         g1 = self._gates[index]
         g2 = self._gates[(index + 1) % len(self)]
         
-        if ignore_identical and g1 == g2:
+        # Target of either gate used as a control by the other
+        if g1.target in (g2.ctrl1, g2.ctrl2) or g2.target in (g1.ctrl1, g1.ctrl2):
             return False
         
-        # Check if target of g1 is used by g2
-        g1_target_collision = g1.target in (g2.ctrl1, g2.ctrl2)
-        # Check if target of g2 is used by g1
-        g2_target_collision = g2.target in (g1.ctrl1, g1.ctrl2)
-        
-        return not g1_target_collision and not g2_target_collision
+        # Identical gates; compared field-wise last, as the rarest case
+        return not (
+            ignore_identical
+            and g1.target == g2.target and g1.ctrl1 == g2.ctrl1 and g1.ctrl2 == g2.ctrl2
+        )
     
     def swap(self, index: int) -> "ECA57Circuit":
         """Return new circuit with gates at index and index+1 swapped."""
@@ -238,11 +266,9 @@ class ECA57Circuit:
         Returns:
             New circuit with permuted wire labels.
         """
-        new = ECA57Circuit(self._width)
-        for g in self._gates:
-            new_gate = ECA57Gate(perm[g.target], perm[g.ctrl1], perm[g.ctrl2])
-            new._gates.append(new_gate)
-        return new
+        return ECA57Circuit._from_key(
+            self._width, [(perm[t], perm[c1], perm[c2]) for t, c1, c2 in self._key()]
+        )
     
     def swaps(self) -> List["ECA57Circuit"]:
         """Return list of circuits reachable by one valid swap."""
@@ -254,97 +280,71 @@ class ECA57Circuit:
     
     def rotations(self) -> List["ECA57Circuit"]:
         """Return all unique rotations of this circuit."""
+        # Rotation by shift is a length-n window of the doubled gate/key lists
+        n = len(self)
+        gates = self._gates * 2
+        keys = self._key() * 2
         seen = set()
         results = []
-        for shift in range(len(self)):
-            rotated = self.rotate(shift)
-            key = tuple(g.to_tuple() for g in rotated._gates)
+        for shift in range(n):
+            key = keys[shift:shift + n]
             if key not in seen:
                 seen.add(key)
+                rotated = ECA57Circuit(self._width)
+                rotated._gates = gates[shift:shift + n]
                 results.append(rotated)
         return results
     
     def permutations(self) -> List["ECA57Circuit"]:
         """Return all unique wire permutations of this circuit."""
         from itertools import permutations as iterperms
+        # Permute and dedupe the packed key; only unique ones become circuits
+        gates = self._key()
         seen = set()
         results = []
         for perm in iterperms(range(self._width)):
-            permuted = self.permute(list(perm))
-            key = tuple(g.to_tuple() for g in permuted._gates)
+            key = tuple([(perm[t], perm[c1], perm[c2]) for t, c1, c2 in gates])
             if key not in seen:
                 seen.add(key)
-                results.append(permuted)
+                results.append(ECA57Circuit._from_key(self._width, key))
         return results
     
     def swap_space_bfs(self) -> List["ECA57Circuit"]:
         """Find all circuits reachable by gate swaps (BFS)."""
-        from collections import deque
-        visited = set()
-        results = []
-        queue = deque([self])
-        
-        while queue:
-            curr = queue.popleft()
-            key = tuple(g.to_tuple() for g in curr._gates)
-            if key not in visited:
-                visited.add(key)
-                results.append(curr)
-                for neighbor in curr.swaps():
-                    nkey = tuple(g.to_tuple() for g in neighbor._gates)
-                    if nkey not in visited:
-                        queue.append(neighbor)
-        return results
+        # Search on keys; circuits are built only for the orders found
+        keys = _swap_space_keys(self._key())
+        return [self] + [ECA57Circuit._from_key(self._width, key) for key in keys[1:]]
     
     def unroll(self) -> List["ECA57Circuit"]:
         """Generate all equivalent circuits via Algorithm 2.
         
         Applies: DFS swaps, rotations, reversal, permutations.
         
+        Each step runs on gate keys and drops duplicates as they appear
+        (first occurrence wins, as in the step-by-step version), so only
+        the distinct final circuits are built.
+        
         Returns:
             List of all equivalent circuits.
         """
-        # Step 1: Swap space (DFS/BFS)
-        equivalents = self.swap_space_bfs()
-        
-        # Step 2: Rotations
-        new_equivs = []
-        for c in equivalents:
-            new_equivs.extend(c.rotations())
-        equivalents = new_equivs
-        
-        # Step 3: Mirror (reverse)
-        new_equivs = []
-        for c in equivalents:
-            new_equivs.append(c)
-            new_equivs.append(c.reverse())
-        equivalents = new_equivs
-        
-        # Step 4: Remove duplicates
-        seen = set()
-        unique = []
-        for c in equivalents:
-            key = tuple(g.to_tuple() for g in c._gates)
-            if key not in seen:
-                seen.add(key)
-                unique.append(c)
-        equivalents = unique
+        n = len(self)
         
-        # Step 5: Wire permutations
-        new_equivs = []
-        for c in equivalents:
-            new_equivs.extend(c.permutations())
+        # Steps 1-4: swap space, then every rotation and its mirror
+        orderings: dict = {}
+        for key in _swap_space_keys(self._key()):
+            for shift in range(n):
+                rotated = key[shift:] + key[:shift]
+                orderings[rotated] = None
+                orderings[rotated[::-1]] = None
         
-        # Final dedup
-        seen = set()
-        unique = []
-        for c in new_equivs:
-            key = tuple(g.to_tuple() for g in c._gates)
-            if key not in seen:
-                seen.add(key)
-                unique.append(c)
+        # Step 5: wire permutations
+        perms = list(permutations(range(self._width)))
+        unique: dict = {}
+        for key in orderings:
+            for perm in perms:
+                unique[tuple([(perm[t], perm[c1], perm[c2]) for t, c1, c2 in key])] = None
         
-        return unique
+        return [ECA57Circuit._from_key(self._width, key) for key in unique]
     
     def canonical(self) -> "ECA57Circuit":
         """Return the canonical (lexicographically smallest) equivalent circuit.
@@ -356,15 +356,9 @@ class ECA57Circuit:
         Returns:
             Canonical form of this circuit.
         """
-        equivalents = self.unroll()
-        
-        # Convert to (tuple_key, circuit) pairs
-        keyed = [(tuple(g.to_tuple() for g in c._gates), c) for c in equivalents]
-        
-        # Find lexicographically smallest
-        keyed.sort(key=lambda x: x[0])
-        
-        return keyed[0][1]
+        canonical = ECA57Circuit(self._width)
+        canonical._gates = [ECA57Gate(*g) for g in self.canonical_key()]
+        return canonical
     
     def canonical_key(self) -> Tuple[Tuple[int, int, int], ...]:
         """Return the canonical key (gate tuple sequence) for this circuit.
@@ -375,7 +369,7 @@ class ECA57Circuit:
         Returns:
             Tuple of (target, ctrl1, ctrl2) tuples for canonical form.
         """
-        return tuple(g.to_tuple() for g in self.canonical()._gates)
+        return _canonical_key(self._key(), self._width)
     
     def slice(self, start: int, end: int) -> "ECA57Circuit":
         """Extract subsequence of gates [start:end].
@@ -469,6 +463,87 @@ class ECA57Circuit:
         return False
 
 
+# Gates are immutable, so equal gates can be shared between circuits
+_GATES: dict = {}
+
+
+def _intern_gate(t: Tuple[int, int, int]) -> ECA57Gate:
+    """Validated shared ECA57Gate for a (target, ctrl1, ctrl2) tuple."""
+    return _GATES.setdefault(t, ECA57Gate(*t))
+
+
+@lru_cache(maxsize=100_000)
+def _canonical_key(
+    gates: Tuple[Tuple[int, int, int], ...], width: int
+) -> Tuple[Tuple[int, int, int], ...]:
+    """ECA57Circuit.canonical_key, memoized on the raw gate tuples.
+    
+    Keyed on the gates rather than the circuit, since circuits are mutable.
+    Walks the same equivalents as unroll() but on key tuples only, keeping
+    the running minimum instead of building circuits.
+    """
+    # Swap space, rotations and mirrors (the orderings unroll permutes)
+    orderings = set()
+    for key in _swap_space_keys(gates):
+        for shift in range(len(key)):
+            rotated = key[shift:] + key[:shift]
+            orderings.add(rotated)
+            orderings.add(rotated[::-1])
+    
+    # The smallest wire permutation of an ordering labels wires by first
+    # occurrence (each new wire takes the lowest free label), so no other
+    # permutation can beat it and only the orderings are compared
+    best = ()
+    for key in orderings:
+        labels: dict = {}
+        relabeled = tuple([
+            (labels.setdefault(t, len(labels)),
+             labels.setdefault(c1, len(labels)),
+             labels.setdefault(c2, len(labels)))
+            for t, c1, c2 in key
+        ])
+        if not best or relabeled < best:
+            best = relabeled
+    return best
+
+
+def _swap_space_keys(gates: Tuple[Tuple[int, int, int], ...]) -> List[tuple]:
+    """Gate orders reachable by commuting swaps, in BFS order from gates."""
+    n = len(gates)
+    visited = {gates}
+    order = [gates]
+    for key in order:
+        for i in range(n):
+            j = (i + 1) % n
+            g1, g2 = key[i], key[j]
+            # Same rule as gate_swappable (identical gates are not swapped)
+            if g1 == g2 or g1[0] in g2[1:] or g2[0] in g1[1:]:
+                continue
+            swapped = list(key)
+            swapped[i], swapped[j] = g2, g1
+            swapped = tuple(swapped)
+            if swapped not in visited:
+                visited.add(swapped)
+                order.append(swapped)
+    return order
+
+
+@lru_cache(maxsize=None)
+def identity_columns(width: int) -> Tuple[int, ...]:
+    """Packed truth-table columns of the identity on width wires.
+    
+    Column b has bit i set iff bit b of i is set: blocks of 2^b zeros
+    then 2^b ones, repeated over 2^width rows.
+    """
+    rows = 1 << width
+    cols = []
+    for b in range(width):
+        half = 1 << b
+        block = ((1 << half) - 1) << half
+        cols.append(block * (((1 << rows) - 1) // ((1 << (2 * half)) - 1)))
+    return tuple(cols)
+
+
 def all_eca57_gates(width: int) -> List[ECA57Gate]:
     """Generate all possible ECA57 gates for a given width.
     
@@ -478,13 +553,10 @@ def all_eca57_gates(width: int) -> List[ECA57Gate]:
     Returns:
         List of all valid ECA57 gates (width * (width-1) * (width-2) gates).
     """
-    gates = []
-    for target in range(width):
-        for ctrl1 in range(width):
-            if ctrl1 == target:
-                continue
-            for ctrl2 in range(width):
-                if ctrl2 == target or ctrl2 == ctrl1:
-                    continue
-                gates.append(ECA57Gate(target, ctrl1, ctrl2))
-    return gates
+    return list(_all_eca57_gates(width))
+
+
+@lru_cache(maxsize=None)
+def _all_eca57_gates(width: int) -> Tuple[ECA57Gate, ...]:
+    """all_eca57_gates, built once per width (gates are immutable)."""
+    return tuple(_intern_gate(t) for t in permutations(range(width), 3))
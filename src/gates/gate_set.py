@@ -101,16 +101,10 @@ class ECA57GateSet(GateSet):
         Returns:
             List of (target, ctrl1, ctrl2) tuples.
         """
-        gates = []
-        for target in range(width):
-            for ctrl1 in range(width):
-                if ctrl1 == target:
-                    continue
-                for ctrl2 in range(width):
-                    if ctrl2 == target or ctrl2 == ctrl1:
-                        continue
-                    gates.append((target, ctrl1, ctrl2))
-        return gates
+        from itertools import permutations
+        
+        # Ordered triples of distinct wires, in (target, ctrl1, ctrl2) order
+        return list(permutations(range(width), 3))
 
 
 def get_gate_set(gate_type: GateSetType) -> GateSet:
@@ -94,6 +94,24 @@ class TestECA57Circuit:
         circ.add_gate(0, 1, 2)
         assert circ.is_identity()
     
+    def test_packed_truth_table_matches_row_simulation(self):
+        """Test the bit-parallel truth table against per-row apply."""
+        circ = ECA57Circuit(5)
+        for gate in [(0, 1, 2), (3, 4, 0), (2, 0, 3), (4, 2, 1), (1, 3, 4)]:
+            circ.add_gate(*gate)
+        
+        expected = [circ.apply([(i >> b) & 1 for b in range(5)]) for i in range(32)]
+        assert circ.compute_truth_table() == expected
+    
+    def test_canonical_key_is_min_over_unroll(self):
+        """Test the streamed canonical key equals the smallest unrolled key."""
+        circ = ECA57Circuit(4)
+        for gate in [(0, 1, 2), (3, 1, 0), (0, 1, 2), (2, 3, 1), (3, 1, 0)]:
+            circ.add_gate(*gate)
+        
+        expected = min(tuple(g.to_tuple() for g in c.gates()) for c in circ.unroll())
+        assert circ.canonical_key() == expected
+    
     def test_circuit_len(self):
         """Test circuit length."""
         circ = ECA57Circuit(3)
@@ -21,7 +21,6 @@ from __future__ import annotations
 from collections.abc import Iterable
 from pysat.formula import CNF as CNF_core, IDPool
 from pysat.card import CardEnc
-from itertools import product
 
 Solution = tuple[bool, list[int]]
 
@@ -39,38 +38,40 @@ class Literal:
         id: Integer ID (non-zero). Negative means negated.
         value: Optional explicit boolean value.
     """
+    __slots__ = ("_name", "_value")
+
     def __init__(self, name: str, id: int, value: bool | None = None):
-        self.__name = name
+        self._name = name
 
         assert not id == 0, "ID cannot be equal to zero"
         if value is None:
-            self.__value = id
+            self._value = id
         else:
             assert id > 0, "ID must be an absolute value if bool value stated"
-            self.__value = id if value else -id
+            self._value = id if value else -id
 
     def __bool__(self) -> bool:
-        return self.__value > 0
+        return self._value > 0
 
     def __neg__(self) -> "Literal":
-        return Literal(self.__name, -self.__value)
+        return Literal(self._name, -self._value)
 
     def __str__(self) -> str:
-        return f"{self.__name}: {self.__bool__()} ({self.__value})"
+        return f"{self._name}: {self.__bool__()} ({self._value})"
 
     def value(self) -> int:
         """Return the signed integer representation of this literal."""
-        return self.__value
+        return self._value
 
     def name(self) -> str:
         """Return the name of this literal."""
-        return self.__name
+        return self._name
 
     def __eq__(self, other) -> bool:
-        return (self.name(), self.value()) == (other.name(), other.value())
+        return (self._name, self._value) == (other.name(), other.value())
 
     def __abs__(self) -> "Literal":
-        return Literal(self.__name, abs(self.__value))
+        return Literal(self._name, abs(self._value))
 
 
 class CNF():
@@ -93,6 +94,8 @@ class CNF():
     def __init__(self):
         self._cnf = CNF_core()
         self._v_pool = IDPool(start_from=1)
+        # IDs handed out by reserve_name, for O(1) check_id
+        self._id_set: set[int] = set()
         self._max_clause_len = 3
         self._caridnality_enc = 1
         self._v_counter = 0
@@ -130,15 +133,14 @@ class CNF():
         return name in self._v_pool.obj2id.keys()
 
     def check_id(self, id: int) -> bool:
-        return abs(id) in self._v_pool.obj2id.values()
+        return abs(id) in self._id_set
 
     def verify_literals(self, literals: list[Literal]) -> bool:
+        # .get does not trigger the pool's defaultdict factory
+        obj2id = self._v_pool.obj2id
         for lit in literals:
-            name = lit.name()
-            if not self.check_name(name):
-                return False
-            found = self.name_to_literal(name)
-            if found is None or not (abs(lit) == abs(found)):
+            id = obj2id.get(lit._name)
+            if id is None or abs(lit._value) != id:
                 return False
         return True
 
@@ -151,6 +153,7 @@ class CNF():
                 "Regular variable name cannot start with uppercase letter"
         assert name not in self._v_pool.obj2id, "Name already registered"
         id = self._v_pool.id(name)
+        self._id_set.add(id)
         return Literal(name, id)
 
     def reserve_names(self, names: Iterable[str], internal: bool = False) -> list[Literal]:
@@ -164,12 +167,12 @@ class CNF():
     def id_to_literal(self, id: int) -> Literal:
         abs_id = abs(id)
         pool = self._v_pool
-        assert abs_id in pool.obj2id.values(), "ID not found in the pool"
+        assert abs_id in self._id_set, "ID not found in the pool"
         name = str(pool.obj(abs_id))
         return Literal(name, id)
 
     def set_literal(self, literal: Literal, value: bool | None = None) -> "CNF":
-        lval = literal.value()
+        lval = literal._value
         if value is not None:
             sign = 1 if value else -1
             lval = sign * abs(lval)
@@ -182,17 +185,17 @@ class CNF():
         return self
 
     def equals(self, literal_a: Literal, literal_b: Literal) -> "CNF":
-        lval_a = literal_a.value()
-        lval_b = literal_b.value()
+        lval_a = literal_a._value
+        lval_b = literal_b._value
         self._cnf.append([-lval_a, lval_b])
         self._cnf.append([lval_a, -lval_b])
         return self
 
     def equals_and(self, literal_a: Literal, literals_b: list[Literal]) -> "CNF":
-        lval_a = literal_a.value()
-        self._cnf.append([lval_a] + [-(b_elem.value())
+        lval_a = literal_a._value
+        self._cnf.append([lval_a] + [-(b_elem._value)
                          for b_elem in literals_b])
-        new_clauses = [[-lval_a, b_elem.value()] for b_elem in literals_b]
+        new_clauses = [[-lval_a, b_elem._value] for b_elem in literals_b]
         self._cnf.clauses += new_clauses
         return self
 
@@ -203,10 +206,10 @@ class CNF():
         return self
 
     def equals_or(self, literal_a: Literal, literals_b: list[Literal]) -> "CNF":
-        lval_a = literal_a.value()
-        self._cnf.append([-lval_a] + [b_elem.value()
+        lval_a = literal_a._value
+        self._cnf.append([-lval_a] + [b_elem._value
                          for b_elem in literals_b])
-        new_clauses = [[lval_a, -b_elem.value()] for b_elem in literals_b]
+        new_clauses = [[lval_a, -b_elem._value] for b_elem in literals_b]
         self._cnf.clauses += new_clauses
         return self
 
@@ -215,14 +218,17 @@ class CNF():
         if clause_len and clause_len <= 2:
             raise ValueError("split must be greater than 2 if set to True")
         if not clause_len or len(literals) <= clause_len:
-            ones = [[1, -1] for _ in literals]
-            ids = [a_elem.value() for a_elem in literals]
-            for prod in product(*ones):
-                if (sum(prod) - len(literals) + 2) % 4 == 0:
-                    self._cnf.append(
-                        [one * a_id for one, a_id in zip(prod, ids)])
+            ids = [a_elem._value for a_elem in literals]
+            n = len(ids)
+            # One clause per sign pattern with an odd number of negations;
+            # the last sign is fixed by the parity of the first n - 1
+            clauses = []
+            for mask in range(1 << (n - 1) if n else 0):
+                negs = (mask << 1) | (~mask.bit_count() & 1)
+                clauses.append([-a_id if negs >> (n - 1 - i) & 1 else a_id
+                                for i, a_id in enumerate(ids)])
+            self._cnf.extend(clauses)
         else:
-            _ = [a_elem.value() for a_elem in literals]
             slice = literals[:clause_len - 1]
             aux_literal = self.reserve_name(f"A{self._v_counter}", True)
             self._v_counter += 1
@@ -231,7 +237,7 @@ class CNF():
         return self
 
     def atleast(self, literals: list[Literal], lower_bound: int) -> "CNF":
-        ids = [lit.value() for lit in literals]
+        ids = [lit._value for lit in literals]
         clauses = CardEnc.atleast(
             ids,
             lower_bound,
@@ -242,7 +248,7 @@ class CNF():
         return self
 
     def atmost(self, literals: list[Literal], upper_bound: int) -> "CNF":
-        ids = [lit.value() for lit in literals]
+        ids = [lit._value for lit in literals]
         clauses = CardEnc.atmost(
             ids,
             upper_bound,
@@ -253,7 +259,7 @@ class CNF():
         return self
 
     def exactly(self, literals: list[Literal], upper_bound: int) -> "CNF":
-        ids = [lit.value() for lit in literals]
+        ids = [lit._value for lit in literals]
         clauses = CardEnc.equals(
             ids,
             upper_bound,
@@ -264,8 +270,8 @@ class CNF():
         return self
 
     def nand(self, literal_a: Literal, literal_b: Literal) -> "CNF":
-        lval_a = literal_a.value()
-        lval_b = literal_b.value()
+        lval_a = literal_a._value
+        lval_b = literal_b._value
         self._cnf.append([-lval_a, -lval_b])
         return self
 
@@ -286,6 +292,8 @@ class CNF():
         if not sat:
             return {"sat": False}
         all_literals = self.v_pool().obj2id.items()
-        model = {name: -id not in solution_ints for name, id in all_literals}
+        # Hash the model once; membership tests on the list were O(len(model)) each
+        assigned = set(solution_ints)
+        model = {name: -id not in assigned for name, id in all_literals}
         model["sat"] = True
         return model
@@ -3,7 +3,7 @@ from random import randint, sample
 from itertools import product
 from functools import reduce
 from copy import deepcopy
-from sat.cnf import CNF
+from sat.cnf import CNF, Literal
 from sat.solver import Solver
 
 
@@ -272,3 +272,15 @@ def test_atmost(long_cnf, solver):
     model = cnf.make_dict_model(solution)
     assert model["sat"]
     assert sum([model[lit.name()] for lit in literals]) <= upper_bound
+
+
+def test_pool_id_checks(long_cnf):
+    cnf, primary_literal, literals = deepcopy(long_cnf)
+    cnf.atmost(literals, 1)
+    top = cnf.v_pool().top
+    assert all(cnf.check_id(-lit.value()) for lit in literals)
+    assert not cnf.check_id(top)  # cardinality auxiliaries are not named
+    assert cnf.id_to_literal(-primary_literal.value()) == -primary_literal
+    assert cnf.verify_literals([primary_literal, -literals[0]])
+    assert not cnf.verify_literals([Literal("p", literals[0].value())])
+    assert not cnf.verify_literals([Literal("unknown", primary_literal.value())])
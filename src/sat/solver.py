@@ -20,8 +20,10 @@ from pysat.solvers import Solver as PySolver
 from subprocess import Popen, PIPE
 from sat.cnf import CNF, Solution
 
-import threading
-import queue
+import re
+
+# A whole whitespace-separated token that is an optionally negative integer
+_INT_TOKEN = re.compile(r"(?<!\S)-?[0-9]+(?!\S)")
 
 
 class Solver:
@@ -110,53 +112,35 @@ class Solver:
     def _solve_external(self, cnf: CNF) -> Solution:
         args = self.external_solvers[self.__name]
         if self.__args is not None:
-            args += self.__args
+            args = args + self.__args
         p = Popen([self.__name, *args], stdin=PIPE, stdout=PIPE, stderr=PIPE)
 
+        # Stream DIMACS in chunks straight from this thread; the solver reads
+        # all of its input before it writes anything back
         clauses = cnf._cnf.clauses
         cls_num = len(clauses)
         step = 20000
 
-        def producer(out_q):
-            header = f"p cnf {cnf._cnf.nv} {cls_num}\n"
-            out_q.put(header)
-            for i in range(0, cls_num, step):
-                slice = clauses[i : i + step]
-                string = " 0\n".join([" ".join([str(lit) for lit in cl]) for cl in slice]) + " 0\n"
-                out_q.put(string)
-            out_q.put(None)
-
-        def consumer(in_q, p):
-            while True:
-                item = in_q.get()
-                if item is None:
-                    break
-                p.stdin.write(item.encode())
-            p.stdin.close()
-
-        q = queue.Queue()
-        t1 = threading.Thread(target=producer, args=(q,))
-        t2 = threading.Thread(target=consumer, args=(q, p))
-        t1.start()
-        t2.start()
-        t1.join()
-        t2.join()
-
-        assert p.stdout is not None
+        assert p.stdin is not None and p.stdout is not None
+        p.stdin.write(f"p cnf {cnf._cnf.nv} {cls_num}\n".encode())
+        for i in range(0, cls_num, step):
+            chunk = clauses[i : i + step]
+            string = " 0\n".join([" ".join([str(lit) for lit in cl]) for cl in chunk]) + " 0\n"
+            p.stdin.write(string.encode())
+        p.stdin.close()
+
         out = p.stdout.read()
+        p.wait()
 
         string = out.decode("utf-8")
         return self._parse_solution(string)
 
     @staticmethod
     def _parse_solution(string: str) -> Solution:
-        string = string.lower()
-        if "unsat" in string:
+        if "unsat" in string.lower():
             return (False, [])
 
-        def is_int(s):
-            return s.isdigit() or (s[0] == "-" and s[1:].isdigit())
-
-        ints = [int(s) for s in string.split() if is_int(s)]
+        # Whitespace-delimited integer tokens, found in one regex pass
+        ints = map(int, _INT_TOKEN.findall(string))
         ids = [i for i in ints if i != 0]
         return (True, ids)
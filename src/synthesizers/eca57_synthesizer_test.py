@@ -10,6 +10,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from gates.eca57 import ECA57Circuit, ECA57Gate
 from circuit.eca57_dim_group import ECA57DimGroup
 from circuit.eca57_collection import ECA57Collection
+from database.basis import batch_canonicalize, get_basis
 from synthesizers.eca57_dimgroup_synthesizer import (
     ECA57PartialSynthesizer,
     ECA57DimGroupSynthesizer,
@@ -67,6 +68,26 @@ class TestECA57DimGroup:
         assert dg2.width == 3
         assert dg2.gate_count == 2
 
+    def test_batch_canonicalize_matches_basis(self):
+        """Test batch canonical hashes of to_array agree with ECA57Basis.canonicalize."""
+        dg = ECA57DimGroup(5, 3)
+        for gates in [[(4, 3, 0), (0, 1, 2), (4, 3, 0)],
+                      [(0, 1, 2), (2, 3, 4), (1, 0, 4)],
+                      [(3, 4, 1), (1, 0, 2), (3, 4, 1)]]:
+            circ = ECA57Circuit(5)
+            for g in gates:
+                circ.add_gate(*g)
+            dg.append(circ)
+
+        basis = get_basis("eca57")
+        _, hashes = batch_canonicalize(dg.to_array(), 5)
+        assert hashes.shape == (3, 16)
+        for circ, h in zip(dg, hashes):
+            _, expected = basis.canonicalize([g.to_tuple() for g in circ.gates()], 5)
+            assert h.tobytes() == expected
+        # Circuits 1 and 3 relabel to the same canonical form
+        assert hashes[0].tobytes() == hashes[2].tobytes()
+
 
 class TestECA57Collection:
     """Tests for ECA57Collection container."""
@@ -129,6 +150,49 @@ class TestECA57Collection:
         coll2 = ECA57Collection.load_compact(path)
         assert coll2.total_circuits() == 1
 
+    def test_compact_format(self, tmp_path):
+        """Test compact format writes one 'w,gc:t,c1,c2;...' line per circuit."""
+        coll = ECA57Collection(5, 4)
+
+        dg = ECA57DimGroup(5, 2)
+        circ = ECA57Circuit(5)
+        circ.add_gate(4, 3, 0)
+        circ.add_gate(4, 3, 0)
+        dg.append(circ)
+        coll[5][2] = dg
+
+        path = tmp_path / "test_collection.txt"
+        coll.save_compact(path)
+
+        lines = path.read_text().splitlines()
+        assert lines[0] == "# ECA57Collection max_width=5 max_gc=4"
+        assert lines[1:] == ["5,2:4,3,0;4,3,0"]
+
+        coll2 = ECA57Collection.load_compact(path)
+        assert [g.to_tuple() for g in coll2[5][2][0].gates()] == [(4, 3, 0), (4, 3, 0)]
+
+    def test_remove_reducibles(self):
+        """Test that circuits containing a smaller identity are removed."""
+        coll = ECA57Collection(3, 4)
+
+        dg2 = ECA57DimGroup(3, 2)
+        dg2.append(ECA57Circuit(3).add_gate(0, 1, 2).add_gate(0, 1, 2))
+        coll[3][2] = dg2
+
+        dg4 = ECA57DimGroup(3, 4)
+        reducible = ECA57Circuit(3)
+        for g in [(1, 0, 2), (0, 1, 2), (0, 1, 2), (1, 0, 2)]:
+            reducible.add_gate(*g)
+        irreducible = ECA57Circuit(3)
+        for g in [(0, 1, 2), (1, 0, 2), (0, 1, 2), (1, 0, 2)]:
+            irreducible.add_gate(*g)
+        dg4.extend([reducible, irreducible])
+        coll[3][4] = dg4
+
+        coll.remove_reducibles()
+        assert len(coll[3][2]) == 1
+        assert [c == irreducible for c in coll[3][4]] == [True]
+
 
 class TestECA57Synthesis:
     """Tests for synthesis functionality."""